@@ -1,34 +1,65 @@
-import ollama
-from typing import Dict, Any
+import json
+import os
+from typing import Dict, Any, Callable, Iterator
 from database.query_interface import get_sustainability_metrics
 from agents.research_agent import ResearchAgent
+from utils.embeddings import generate_embedding
+from utils.concurrency import run_concurrently, run_sequentially, stream_concurrently
+from utils.llm import chat, stream_chat
+from utils.llm_scheduler import Overloaded
+from utils.model_registry import model_registry
+from utils.prompt_templates import (
+    ADVICE_PEST_MANAGEMENT_SYSTEM_PROMPT,
+    ADVICE_RESOURCE_OPTIMIZATION_SYSTEM_PROMPT,
+    ADVICE_STRUCTURED_SYSTEM_PROMPT,
+    ADVICE_SUSTAINABILITY_SYSTEM_PROMPT,
+)
+from utils.query_parsing import AdviceQuery
+from utils.semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticCache
+from utils.single_flight import SingleFlight
+
+# Seconds to wait for the advice sections before answering with what has finished
+SECTION_TIMEOUT = float(os.getenv("ADVICE_SECTION_TIMEOUT", "60"))
+
+SECTION_TITLES = {
+    'sustainability': 'Sustainability advice',
+    'pest_management': 'Pest management advice',
+    'resource_optimization': 'Resource optimization advice',
+}
+
+# 'sections' asks one model per section; 'single_pass' asks one model for all
+# three as schema-constrained JSON, so the shared context is prefilled once
+ADVICE_MODES = ('sections', 'single_pass')
+ADVICE_MODE = os.getenv("ADVICE_MODE", "sections")
+
+# Near-duplicate reuse: the mode and the fields that shape the section
+# content must match exactly; only the location and soil wording is
+# compared by embedding
+SEMANTIC_PARTITION_FIELDS = ('crop', 'water_availability', 'pest_issues')
+SEMANTIC_MATCH_FIELDS = ('location', 'soil_type')
+
+# Passed as Ollama's `format`; generation is constrained to this shape
+ADVICE_SCHEMA = {
+    'type': 'object',
+    'properties': {name: {'type': 'string'} for name in SECTION_TITLES},
+    'required': list(SECTION_TITLES),
+}
 
 class FarmerAdvisor:
-    def __init__(self):
-        self.models = {
-            'sustainability': 'phi',  # Using phi for sustainability analysis
-            'pest_management': 'tinyllama',  # Using tinyllama for pest management
-            'resource_optimization': 'gemma',  # Using gemma for resource optimization
-        }
+    def __init__(self, concurrent: bool = True, section_timeout: float = SECTION_TIMEOUT, mode: str = ADVICE_MODE):
+        self.concurrent = concurrent
+        self.section_timeout = section_timeout
+        self.mode = mode
+        self.roles = ('sustainability', 'pest_management', 'resource_optimization')
+        if mode == 'single_pass':
+            self.roles += ('structured_advice',)
         self.research_agent = ResearchAgent()
-        self._check_models()
-
-    def _check_models(self):
-        """Check if required models are available, if not use fallback model"""
-        try:
-            # Try to get list of available models
-            available_models = [model['name'] for model in ollama.list()['models']]
-            print(f"Available models: {available_models}")
-            
-            # Check each model and use fallback if not available
-            for key, model in self.models.items():
-                if model not in available_models:
-                    print(f"Model {model} not found, using tinyllama as fallback")
-                    self.models[key] = 'tinyllama'  # Use tinyllama as fallback
-        except Exception as e:
-            print(f"Error checking models: {e}")
-            # If we can't check models, use tinyllama for everything
-            self.models = {key: 'tinyllama' for key in self.models}
+        # Identical requests that arrive together share one set of generations
+        self.inflight = SingleFlight()
+        # Near-duplicate requests ("loam" / "loamy soil") reuse generated sections
+        self.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+        # Load this agent's models now so the first request does not pay for it
+        model_registry.warm(self.roles)
 
     def get_farm_advice(
         self,
@@ -38,42 +69,89 @@ class FarmerAdvisor:
         season: str = '',
         water_availability: str = '',
         previous_crop: str = '',
-        pest_issues: str = ''
+        pest_issues: str = '',
+        mode: str = None
     ) -> Dict[str, Any]:
-        """Get comprehensive farming advice using available models"""
+        """Get comprehensive farming advice using available models.
+
+        mode picks 'sections' (one call per section) or 'single_pass' (one
+        JSON call for all three); it defaults to the advisor's mode.
+        """
+        mode = mode or self.mode
+        if mode not in ADVICE_MODES:
+            return {"error": f"Unknown advice mode '{mode}', expected one of {', '.join(ADVICE_MODES)}", "metrics": None}
+        # Equivalent spellings share one computation (and one cache entry downstream)
+        query = AdviceQuery.create(
+            location=location, crop=crop, soil_type=soil_type, season=season,
+            water_availability=water_availability, previous_crop=previous_crop,
+            pest_issues=pest_issues
+        )
+        return self.inflight.do(query.key + (mode,), lambda: self._compute_farm_advice(query, mode))
+
+    def _compute_farm_advice(self, query: AdviceQuery, mode: str) -> Dict[str, Any]:
+        params = query.as_kwargs()
+        location, crop, soil_type = params['location'], params['crop'], params['soil_type']
+        water_availability, pest_issues = params['water_availability'], params['pest_issues']
         try:
             # Get sustainability metrics
             metrics = get_sustainability_metrics(crop, location)
+
+            vector, cached, similarity = self._semantic_lookup(query, mode)
+            if cached:
+                return {
+                    "advice": self._combine_advice(*(cached['sections'][name] for name in SECTION_TITLES)),
+                    "metrics": metrics,
+                    "research_sources": cached['research_sources'],
+                    "unavailable_sections": {},
+                    "semantic_cache": {"hit": True, "similarity": similarity},
+                    "mode": mode
+                }
             
             # Get research findings
             research_data = self.research_agent.get_sustainable_practices(crop, location)
             
-            # Get advice from different models
-            sustainability_advice = self._get_sustainability_advice(
-                location, crop, soil_type, metrics, research_data
-            )
-            
-            pest_management_advice = self._get_pest_management_advice(
-                crop, pest_issues, research_data
-            )
-            
-            resource_advice = self._get_resource_optimization_advice(
-                location, crop, water_availability, metrics
-            )
-            
-            # Combine all advice
+            if mode == 'single_pass':
+                sections, failures = self._single_pass_sections(
+                    location, crop, soil_type, water_availability, pest_issues,
+                    metrics, research_data
+                )
+            else:
+                # Get advice from different models
+                tasks = self._section_tasks(
+                    location, crop, soil_type, water_availability, pest_issues,
+                    metrics, research_data
+                )
+                sections, failures = self._run(tasks)
+
+            if not sections:
+                raise RuntimeError(f"No advice sections could be generated: {failures}")
+
+            # Combine all advice, marking any section that did not finish
             combined_advice = self._combine_advice(
-                sustainability_advice,
-                pest_management_advice,
-                resource_advice
+                *(sections.get(name) or self._unavailable_section(name, failures[name])
+                  for name in SECTION_TITLES)
             )
-            
+
+            research_sources = [r['source'] for r in research_data]
+            if vector is not None and not failures:
+                # Only complete answers are worth reusing
+                self.semantic_cache.store(self._semantic_partition(query, mode), vector, {
+                    "sections": sections,
+                    "research_sources": research_sources
+                })
+
             return {
                 "advice": combined_advice,
                 "metrics": metrics,
-                "research_sources": [r['source'] for r in research_data]
+                "research_sources": research_sources,
+                "unavailable_sections": failures,
+                "semantic_cache": {"hit": False, "similarity": similarity},
+                "mode": mode
             }
             
+        except Overloaded:
+            # Every model call was shed: let the app answer 503
+            raise
         except Exception as e:
             print(f"Error in get_farm_advice: {e}")
             return {
@@ -81,133 +159,273 @@ class FarmerAdvisor:
                 "metrics": None
             }
 
-    def _get_sustainability_advice(
+    def stream_farm_advice(
         self,
         location: str,
         crop: str,
         soil_type: str,
+        season: str = '',
+        water_availability: str = '',
+        previous_crop: str = '',
+        pest_issues: str = ''
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream farming advice as events: metrics first, then research sources, then model tokens as they arrive"""
+        try:
+            metrics = get_sustainability_metrics(crop, location)
+        except Exception as e:
+            print(f"Error in stream_farm_advice: {e}")
+            yield {"event": "error", "error": str(e)}
+            return
+
+        # Sent before research retrieval, which may wait on the embedding model
+        yield {"event": "metrics", "metrics": metrics}
+
+        try:
+            research_data = self.research_agent.get_sustainable_practices(crop, location)
+        except Exception as e:
+            # The metrics are already out; advise without research findings
+            print(f"Error fetching research in stream_farm_advice: {e}")
+            research_data = []
+        yield {"event": "research", "research_sources": [r['source'] for r in research_data]}
+
+        tasks = self._section_tasks(
+            location, crop, soil_type, water_availability, pest_issues,
+            metrics, research_data, stream=True
+        )
+        sections = {name: [] for name in tasks}
+        failures = {}
+        for name, kind, payload in stream_concurrently(tasks, self.section_timeout):
+            if kind == 'chunk':
+                sections[name].append(payload)
+                yield {"event": "token", "section": name, "content": payload}
+                continue
+            if kind != 'done':
+                failures[name] = payload or kind
+            yield {"event": "section_end", "section": name, "status": 'ok' if kind == 'done' else kind}
+
+        combined_advice = self._combine_advice(
+            *(''.join(sections[name]) if name not in failures
+              else self._unavailable_section(name, failures[name])
+              for name in tasks)
+        )
+        yield {"event": "done", "advice": combined_advice, "unavailable_sections": failures}
+
+    def _section_tasks(
+        self,
+        location: str,
+        crop: str,
+        soil_type: str,
+        water_availability: str,
+        pest_issues: str,
+        metrics: Dict[str, float],
+        research_data: list,
+        stream: bool = False
+    ) -> Dict[str, Callable]:
+        """Build the per-section model calls shared by the blocking and streaming paths"""
+        return {
+            'sustainability': lambda: self._get_sustainability_advice(
+                location, crop, soil_type, metrics, research_data, stream
+            ),
+            'pest_management': lambda: self._get_pest_management_advice(
+                crop, pest_issues, research_data, stream
+            ),
+            'resource_optimization': lambda: self._get_resource_optimization_advice(
+                location, crop, water_availability, metrics, stream
+            ),
+        }
+
+    def _run(self, tasks: Dict[str, Callable]):
+        if self.concurrent:
+            return run_concurrently(tasks, self.section_timeout)
+        return run_sequentially(tasks)
+
+    def _single_pass_sections(
+        self,
+        location: str,
+        crop: str,
+        soil_type: str,
+        water_availability: str,
+        pest_issues: str,
         metrics: Dict[str, float],
         research_data: list
-    ) -> str:
-        """Get sustainability advice from Phi-2 model"""
+    ):
+        """Generate all sections with one call; returns the same (sections, failures) as the per-section path"""
+        results, errors = self._run({'single_pass': lambda: self._get_structured_advice(
+            location, crop, soil_type, water_availability, pest_issues, metrics, research_data
+        )})
+        if errors:
+            return {}, {name: errors['single_pass'] for name in SECTION_TITLES}
+        sections = {name: text for name, text in results['single_pass'].items() if text}
+        return sections, {name: 'missing from model output' for name in SECTION_TITLES if name not in sections}
+
+    def _get_structured_advice(
+        self,
+        location: str,
+        crop: str,
+        soil_type: str,
+        water_availability: str,
+        pest_issues: str,
+        metrics: Dict[str, float],
+        research_data: list
+    ) -> Dict[str, str]:
+        """Ask one model for every section as JSON matching ADVICE_SCHEMA"""
         prompt = f"""
-        As a sustainable farming expert, provide concise and actionable advice for {crop} cultivation in {location} with {soil_type} soil.
+        Crop: {crop}
+        Location: {location}
+        Soil Type: {soil_type}
+
+        Research Findings:
+        {self._format_research_data(research_data)}
 
         Current Metrics:
         - Sustainability Score: {metrics.get('sustainability_score', 'N/A')}
         - Fertilizer Usage: {metrics.get('fertilizer_usage', 'N/A')} kg/ha
         - Pesticide Usage: {metrics.get('pesticide_usage', 'N/A')} kg/ha
         - Crop Yield: {metrics.get('crop_yield', 'N/A')} tons/ha
-        
-        Research Findings:
-        {self._format_research_data(research_data)}
-        
-        Provide advice focusing on:
-        1. Sustainable farming practices
-        2. Soil health improvement
-        3. Resource optimization
-        4. Environmental impact reduction
+        - Water Usage: {metrics.get('water_usage', 'N/A')} liters/ha
+        - Energy Consumption: {metrics.get('energy_usage', 'N/A')} kWh/ha
+        - Resource Efficiency Score: {metrics.get('resource_efficiency', 'N/A')}
 
-        Format the response in clear, concise bullet points with specific, actionable recommendations.
+        Water Availability: {water_availability or 'Not specified'}
+        Known Pest Issues: {pest_issues or 'None specified'}
         """
-        
-        response = ollama.chat(
-            model=self.models['sustainability'],
+        response = chat(
+            model=model_registry.resolve('structured_advice'),
             messages=[
                 {
                     'role': 'system',
-                    'content': 'You are a sustainable farming expert specializing in eco-friendly agricultural practices. Provide concise, actionable advice.'
+                    'content': ADVICE_STRUCTURED_SYSTEM_PROMPT
                 },
                 {
                     'role': 'user',
                     'content': prompt
                 }
-            ]
+            ],
+            format=ADVICE_SCHEMA,
+            **model_registry.request_options('structured_advice')
         )
-        
+        content = json.loads(response['message']['content'])
+        if not isinstance(content, dict):
+            raise ValueError("Structured advice is not a JSON object")
+        # Small models sometimes answer a field with a list of bullets
+        return {
+            name: '\n'.join(f"• {item}" for item in value) if isinstance(value, list) else str(value or '').strip()
+            for name, value in content.items() if name in SECTION_TITLES
+        }
+
+    def _generate(self, role: str, system: str, prompt: str, stream: bool = False):
+        """Run one section's model call, returning its text or a token iterator"""
+        messages = [
+            {
+                'role': 'system',
+                'content': system
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+        if stream:
+            return stream_chat(
+                model=model_registry.resolve(role), messages=messages, **model_registry.request_options(role)
+            )
+
+        response = chat(model=model_registry.resolve(role), messages=messages, **model_registry.request_options(role))
         return response['message']['content']
 
+    # The prompts below carry only the request's data, least variable first;
+    # the static instructions are the system prompts in utils.prompt_templates
+
+    def _get_sustainability_advice(
+        self,
+        location: str,
+        crop: str,
+        soil_type: str,
+        metrics: Dict[str, float],
+        research_data: list,
+        stream: bool = False
+    ) -> str:
+        """Get sustainability advice from Phi-2 model"""
+        prompt = f"""
+        Crop: {crop}
+        Location: {location}
+        Soil Type: {soil_type}
+
+        Research Findings:
+        {self._format_research_data(research_data)}
+
+        Current Metrics:
+        - Sustainability Score: {metrics.get('sustainability_score', 'N/A')}
+        - Fertilizer Usage: {metrics.get('fertilizer_usage', 'N/A')} kg/ha
+        - Pesticide Usage: {metrics.get('pesticide_usage', 'N/A')} kg/ha
+        - Crop Yield: {metrics.get('crop_yield', 'N/A')} tons/ha
+        """
+        
+        return self._generate('sustainability', ADVICE_SUSTAINABILITY_SYSTEM_PROMPT, prompt, stream)
+
     def _get_pest_management_advice(
         self,
         crop: str,
         pest_issues: str,
-        research_data: list
+        research_data: list,
+        stream: bool = False
     ) -> str:
         """Get pest management advice from TinyLlama model"""
         prompt = f"""
-        Provide concise pest management advice for {crop} cultivation.
-        
-        Known Pest Issues: {pest_issues or 'None specified'}
-        
+        Crop: {crop}
+
         Research Findings:
         {self._format_research_data(research_data)}
-        
-        Focus on:
-        1. Integrated Pest Management (IPM) strategies
-        2. Natural pest control methods
-        3. Preventive measures
-        4. Treatment options
 
-        Format the response in clear, concise bullet points with specific, actionable recommendations.
+        Known Pest Issues: {pest_issues or 'None specified'}
         """
         
-        response = ollama.chat(
-            model=self.models['pest_management'],
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are an expert in agricultural pest management and control. Provide concise, actionable advice.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        )
-        
-        return response['message']['content']
+        return self._generate('pest_management', ADVICE_PEST_MANAGEMENT_SYSTEM_PROMPT, prompt, stream)
 
     def _get_resource_optimization_advice(
         self,
         location: str,
         crop: str,
         water_availability: str,
-        metrics: Dict[str, float]
+        metrics: Dict[str, float],
+        stream: bool = False
     ) -> str:
         """Get resource optimization advice from Gemma model"""
         prompt = f"""
-        Provide concise resource optimization advice for {crop} cultivation in {location}.
-        
-        Water Availability: {water_availability}
+        Crop: {crop}
+        Location: {location}
+
         Current Metrics:
         - Water Usage: {metrics.get('water_usage', 'N/A')} liters/ha
         - Energy Consumption: {metrics.get('energy_usage', 'N/A')} kWh/ha
         - Resource Efficiency Score: {metrics.get('resource_efficiency', 'N/A')}
-        
-        Focus on:
-        1. Water conservation techniques
-        2. Energy efficiency
-        3. Resource allocation
-        4. Cost optimization
 
-        Format the response in clear, concise bullet points with specific, actionable recommendations.
+        Water Availability: {water_availability}
         """
         
-        response = ollama.chat(
-            model=self.models['resource_optimization'],
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are an expert in agricultural resource optimization and efficiency. Provide concise, actionable advice.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        )
-        
-        return response['message']['content']
+        return self._generate('resource_optimization', ADVICE_RESOURCE_OPTIMIZATION_SYSTEM_PROMPT, prompt, stream)
+
+    def _semantic_lookup(self, query: AdviceQuery, mode: str):
+        """Return (request embedding, cached sections or None, best similarity)"""
+        if self.semantic_cache is None:
+            return None, None, None
+        try:
+            vector = generate_embedding(query.describe(SEMANTIC_MATCH_FIELDS))
+        except Exception as e:
+            print(f"Semantic cache unavailable: {e}")
+            return None, None, None
+        cached, similarity = self.semantic_cache.lookup(self._semantic_partition(query, mode), vector)
+        return vector, cached, similarity
+
+    def _semantic_partition(self, query: AdviceQuery, mode: str) -> tuple:
+        """Only requests in the same mode for the same crop, water availability and pests are compared"""
+        return (mode, *(getattr(query, name) for name in SEMANTIC_PARTITION_FIELDS))
+
+    def _unavailable_section(self, name: str, reason: str) -> str:
+        """Placeholder text for a section that timed out or failed"""
+        if reason == 'timeout':
+            return f"• {SECTION_TITLES[name]} is taking too long to generate. Please try again shortly."
+        return f"• {SECTION_TITLES[name]} is currently unavailable."
 
     def _format_research_data(self, research_data: list) -> str:
         """Format research data for prompts"""
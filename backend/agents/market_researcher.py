@@ -1,40 +1,29 @@
-import ollama
+import os
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterator
 from database.query_interface import fetch_market_conditions
 from datetime import datetime, timedelta
+from utils.concurrency import run_concurrently, stream_concurrently
+from utils.llm import chat, stream_chat
+from utils.llm_scheduler import Overloaded
+from utils.model_registry import model_registry
+from utils.prompt_templates import MARKET_DEMAND_SYSTEM_PROMPT, MARKET_PRICE_SYSTEM_PROMPT, MARKET_TREND_SYSTEM_PROMPT
 
-class MarketResearcher:
-    def __init__(self):
-        self.models = {
-            'trend_analysis': 'phi',  # Using phi for trend analysis
-            'demand_forecast': 'tinyllama',  # Using tinyllama for demand forecasting
-            'price_prediction': 'gemma',  # Using gemma for price prediction
-        }
-        self._check_models()
+# Seconds each insight model gets before its section is reported as timed out
+INSIGHT_TIMEOUT = float(os.getenv("MARKET_INSIGHT_TIMEOUT", "60"))
 
-    def _check_models(self):
-        """Check if required models are available, if not use fallback model"""
-        try:
-            # Try to get list of available models
-            available_models = [model['name'] for model in ollama.list()['models']]
-            print(f"Available models: {available_models}")
-            
-            # Check each model and use fallback if not available
-            for key, model in self.models.items():
-                if model not in available_models:
-                    print(f"Model {model} not found, using tinyllama as fallback")
-                    self.models[key] = 'tinyllama'  # Use tinyllama as fallback
-        except Exception as e:
-            print(f"Error checking models: {e}")
-            # If we can't check models, use tinyllama for everything
-            self.models = {key: 'tinyllama' for key in self.models}
+class MarketResearcher:
+    def __init__(self, insight_timeout: float = INSIGHT_TIMEOUT):
+        self.insight_timeout = insight_timeout
+        self.roles = ('trend_analysis', 'demand_forecast', 'price_prediction')
+        # Load this agent's models now so the first request does not pay for it
+        model_registry.warm(self.roles)
 
     def get_market_trends(self, region: str, crop: str) -> Dict[str, Any]:
         """Get comprehensive market analysis using available models"""
         try:
             # Fetch market data
-            market_data = fetch_market_conditions(crop=crop, date_range=30)
+            market_data = fetch_market_conditions(product=crop, date_range=30)
             if market_data.empty:
                 return {
                     "error": "No market data available",
@@ -44,23 +33,36 @@ class MarketResearcher:
             # Calculate metrics
             metrics = self._calculate_metrics(market_data)
 
-            # Get insights from different models
-            trend_analysis = self._get_trend_analysis(region, crop, metrics)
-            demand_forecast = self._get_demand_forecast(region, crop, metrics)
-            price_prediction = self._get_price_prediction(region, crop, metrics)
+            # Get insights from different models in parallel; a slow or failing
+            # model only costs its own section
+            tasks = self._insight_tasks(region, crop, metrics)
+            results, failures = run_concurrently(tasks, self.insight_timeout)
+
+            sections = {}
+            for name in tasks:
+                if name in results:
+                    sections[name] = {"status": "ok"}
+                elif failures[name] == 'timeout':
+                    sections[name] = {"status": "timeout"}
+                else:
+                    sections[name] = {"status": "error", "error": failures[name]}
 
             # Combine insights
             combined_insights = self._combine_insights(
-                trend_analysis,
-                demand_forecast,
-                price_prediction
+                *(results.get(name) or f"[{sections[name]['status']}: no insight available]"
+                  for name in tasks)
             )
 
             return {
                 "insights": combined_insights,
-                "metrics": metrics
+                "metrics": metrics,
+                "sections": sections,
+                "partial": bool(failures)
             }
 
+        except Overloaded:
+            # Every model call was shed: let the app answer 503
+            raise
         except Exception as e:
             print(f"Error in get_market_trends: {e}")
             return {
@@ -68,6 +70,80 @@ class MarketResearcher:
                 "metrics": None
             }
 
+    def stream_market_trends(self, region: str, crop: str) -> Iterator[Dict[str, Any]]:
+        """Stream market analysis as events: metrics first, then model tokens as they arrive"""
+        try:
+            market_data = fetch_market_conditions(product=crop, date_range=30)
+            if market_data.empty:
+                yield {"event": "error", "error": "No market data available"}
+                return
+            metrics = self._calculate_metrics(market_data)
+        except Exception as e:
+            print(f"Error in stream_market_trends: {e}")
+            yield {"event": "error", "error": str(e)}
+            return
+
+        yield {"event": "metrics", "metrics": metrics}
+
+        tasks = self._insight_tasks(region, crop, metrics, stream=True)
+        insights = {name: [] for name in tasks}
+        sections = {}
+        for name, kind, payload in stream_concurrently(tasks, self.insight_timeout):
+            if kind == 'chunk':
+                insights[name].append(payload)
+                yield {"event": "token", "section": name, "content": payload}
+                continue
+            sections[name] = {"status": 'ok' if kind == 'done' else kind}
+            if kind == 'error':
+                sections[name]["error"] = payload
+            yield {"event": "section_end", "section": name, **sections[name]}
+
+        combined_insights = self._combine_insights(
+            *(''.join(insights[name]) if sections[name]['status'] == 'ok'
+              else f"[{sections[name]['status']}: no insight available]"
+              for name in tasks)
+        )
+        yield {
+            "event": "done",
+            "insights": combined_insights,
+            "sections": sections,
+            "partial": any(section['status'] != 'ok' for section in sections.values())
+        }
+
+    def _insight_tasks(
+        self,
+        region: str,
+        crop: str,
+        metrics: Dict[str, float],
+        stream: bool = False
+    ) -> Dict[str, Callable]:
+        """Build the per-section model calls shared by the blocking and streaming paths"""
+        return {
+            'trend_analysis': lambda: self._get_trend_analysis(region, crop, metrics, stream),
+            'demand_forecast': lambda: self._get_demand_forecast(region, crop, metrics, stream),
+            'price_prediction': lambda: self._get_price_prediction(region, crop, metrics, stream),
+        }
+
+    def _generate(self, role: str, system: str, prompt: str, stream: bool = False):
+        """Run one section's model call, returning its text or a token iterator"""
+        messages = [
+            {
+                'role': 'system',
+                'content': system
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+        if stream:
+            return stream_chat(
+                model=model_registry.resolve(role), messages=messages, **model_registry.request_options(role)
+            )
+
+        response = chat(model=model_registry.resolve(role), messages=messages, **model_registry.request_options(role))
+        return response['message']['content']
+
     def _calculate_metrics(self, market_data: pd.DataFrame) -> Dict[str, float]:
         """Calculate market metrics from the data"""
         return {
@@ -75,7 +151,7 @@ class MarketResearcher:
             'avg_demand': market_data['demand_index'].mean(),
             'avg_supply': market_data['supply_index'].mean(),
             'avg_competitor_price': market_data['competitor_price'].mean(),
-            'avg_weather_impact': market_data['weather_impact'].mean(),
+            'avg_weather_impact': market_data['weather_impact_score'].mean(),
             'trending_season': self._get_trending_season(market_data),
             'consumer_trend': self._calculate_consumer_trend(market_data)
         }
@@ -90,97 +166,45 @@ class MarketResearcher:
         # Implementation for trend calculation
         return 0.75  # Placeholder
 
-    def _get_trend_analysis(self, region: str, crop: str, metrics: Dict[str, float]) -> str:
+    # Prompts carry only the request's data; the static instructions are the
+    # system prompts in utils.prompt_templates, so they form a shared prefix
+
+    def _get_trend_analysis(self, region: str, crop: str, metrics: Dict[str, float], stream: bool = False) -> str:
         """Get trend analysis from TinyLlama model"""
         prompt = f"""
-        Analyze the market trends for {crop} in {region} based on the following metrics:
+        Crop: {crop}
+        Region: {region}
         - Average Price: ${metrics['avg_price']:.2f}
         - Average Demand: {metrics['avg_demand']:.2f}
         - Average Supply: {metrics['avg_supply']:.2f}
         - Trending Season: {metrics['trending_season']}
-        
-        Provide insights about:
-        1. Price trends and volatility
-        2. Supply-demand dynamics
-        3. Seasonal patterns
-        4. Market opportunities
         """
         
-        response = ollama.chat(
-            model=self.models['trend_analysis'],
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a market trend analyst specializing in agricultural products.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        )
-        
-        return response['message']['content']
+        return self._generate('trend_analysis', MARKET_TREND_SYSTEM_PROMPT, prompt, stream)
 
-    def _get_demand_forecast(self, region: str, crop: str, metrics: Dict[str, float]) -> str:
+    def _get_demand_forecast(self, region: str, crop: str, metrics: Dict[str, float], stream: bool = False) -> str:
         """Get demand forecast from TinyLlama model"""
         prompt = f"""
-        Forecast demand for {crop} in {region} based on:
+        Crop: {crop}
+        Region: {region}
         - Current Demand Index: {metrics['avg_demand']:.2f}
         - Consumer Trend: {metrics['consumer_trend']:.2f}
         - Season: {metrics['trending_season']}
-        
-        Provide:
-        1. Short-term demand forecast
-        2. Factors affecting demand
-        3. Risk factors
         """
         
-        response = ollama.chat(
-            model=self.models['demand_forecast'],
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a demand forecasting specialist for agricultural products.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        )
-        
-        return response['message']['content']
+        return self._generate('demand_forecast', MARKET_DEMAND_SYSTEM_PROMPT, prompt, stream)
 
-    def _get_price_prediction(self, region: str, crop: str, metrics: Dict[str, float]) -> str:
+    def _get_price_prediction(self, region: str, crop: str, metrics: Dict[str, float], stream: bool = False) -> str:
         """Get price prediction from TinyLlama model"""
         prompt = f"""
-        Predict prices for {crop} in {region} based on:
+        Crop: {crop}
+        Region: {region}
         - Current Price: ${metrics['avg_price']:.2f}
         - Competitor Price: ${metrics['avg_competitor_price']:.2f}
         - Weather Impact: {metrics['avg_weather_impact']:.2f}
-        
-        Provide:
-        1. Price range prediction
-        2. Factors affecting price
-        3. Competitor analysis
         """
         
-        response = ollama.chat(
-            model=self.models['price_prediction'],
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a price prediction specialist for agricultural products.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        )
-        
-        return response['message']['content']
+        return self._generate('price_prediction', MARKET_PRICE_SYSTEM_PROMPT, prompt, stream)
 
     def _combine_insights(self, trend: str, demand: str, price: str) -> str:
         """Combine insights from different models into a comprehensive analysis"""
@@ -1,46 +1,136 @@
-import requests
+import os
+import threading
 from bs4 import BeautifulSoup
-import time
-import random
-from typing import List, Dict
-import sqlite3
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from database.connection import DB_PATH
+from database.repository import (
+    init_research_table, get_research, get_research_after, get_research_by_ids, store_research
+)
+from agents.research_scheduler import ResearchRefresher, RESEARCH_MAX_AGE_DAYS
+from scraper.crawler import AsyncCrawler
+from scraper.http_cache import default_cache
+from utils.embeddings import EMBEDDING_BATCH_SIZE, embed_texts, generate_embedding
+from utils.llm_scheduler import BACKGROUND
+from utils.model_registry import model_registry
+from utils.vector_index import VectorIndex
+
+RESEARCH_BACKGROUND_REFRESH = os.getenv("RESEARCH_BACKGROUND_REFRESH", "1") == "1"
+RESEARCH_SEMANTIC_SEARCH = os.getenv("RESEARCH_SEMANTIC_SEARCH", "1") == "1"
+RESEARCH_TOP_K = int(os.getenv("RESEARCH_TOP_K", "5"))
+# Vector files are kept next to the database by default
+RESEARCH_INDEX_PATH = os.getenv("RESEARCH_INDEX_PATH", os.path.join(os.path.dirname(DB_PATH), "research_index"))
+
+RESEARCH_HEADERS = {
+    'User-Agent': 'SustainableFarmingAI/1.0 (Research Agent for Academic Purposes)',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# One crawler per process, so per-host politeness holds across agents
+default_crawler = AsyncCrawler(RESEARCH_HEADERS, http_cache=default_cache)
+# Likewise one vector index, so rows added by any agent are searchable by all
+default_index = VectorIndex(RESEARCH_INDEX_PATH)
+# And one refresher (with its scan loop) per database, however many agents use it
+_refreshers: Dict[str, ResearchRefresher] = {}
+_refreshers_lock = threading.Lock()
 
 class ResearchAgent:
-    def __init__(self, db_path: str = "farming_data.db"):
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        crawler: Optional[AsyncCrawler] = None,
+        index: Optional[VectorIndex] = None
+    ):
         self.db_path = db_path
-        self.headers = {
-            'User-Agent': 'SustainableFarmingAI/1.0 (Research Agent for Academic Purposes)',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
+        self.headers = RESEARCH_HEADERS
+        self.crawler = crawler or default_crawler
+        self.index = index if index is not None else default_index
         self.init_db()
+        with _refreshers_lock:
+            if db_path not in _refreshers:
+                _refreshers[db_path] = ResearchRefresher(self.refresh_research, db_path)
+            self.refresher = _refreshers[db_path]
+        if RESEARCH_BACKGROUND_REFRESH:
+            self.refresher.start()
+            # Catch up on rows stored before the index existed
+            self._index_in_background()
 
     def init_db(self):
         """Initialize the research database table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS research_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                topic TEXT NOT NULL,
-                source TEXT NOT NULL,
-                content TEXT NOT NULL,
-                date_collected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(topic, source, content)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        init_research_table(self.db_path)
 
     def get_sustainable_practices(self, crop: str, location: str) -> List[Dict]:
-        """Get sustainable farming practices for a specific crop and location"""
-        # Check database first
-        cached_data = self._get_cached_research(crop, location)
-        if cached_data:
-            return cached_data
+        """Get sustainable farming practices for a specific crop and location.
+
+        Never scrapes on the caller's thread: cached rows are returned as they
+        are (even if stale) and a missing or stale topic is refreshed in the
+        background for later requests. Semantically related rows from any
+        topic come first, so never-scraped pairs still get relevant research.
+        """
+        cached_data, fresh = self._get_cached_research(crop, location)
+        if not fresh:
+            self.refresher.request_refresh(crop, location)
+
+        related = self.search_research(f"Sustainable farming practices for {crop} in {location}")
+        seen = {r['content'] for r in related}
+        return related + [r for r in cached_data if r['content'] not in seen]
+
+    def search_research(self, text: str, k: int = RESEARCH_TOP_K) -> List[Dict]:
+        """The k stored research rows most similar to text, best first"""
+        if not RESEARCH_SEMANTIC_SEARCH:
+            return []
+        model = model_registry.resolve('embedding')
+        if not self.index.ready(model):
+            # Still being (re)built for this model; partial results would skew ranking
+            self._index_in_background()
+            return []
+        try:
+            hits = self.index.search(generate_embedding(text, model=model), k)
+            rows = {row[0]: row for row in get_research_by_ids([row_id for row_id, _ in hits], db_path=self.db_path)}
+        except Exception as e:
+            print(f"Error searching research: {e}")
+            return []
+        return [{
+            'title': rows[row_id][1],
+            'source': rows[row_id][2],
+            'content': rows[row_id][3],
+            'date_collected': rows[row_id][4],
+            'score': score
+        } for row_id, score in hits if row_id in rows]
+
+    def _index_in_background(self):
+        if not self.index.update_lock.locked():
+            threading.Thread(target=self.index_research, name="research-index", daemon=True).start()
+
+    def index_research(self) -> int:
+        """Embed and index every research row added since the last run.
 
-        # If not in cache, gather new data
+        If the embedding model changed, the index is emptied and every row
+        is embedded again with the new one.
+        """
+        if not RESEARCH_SEMANTIC_SEARCH:
+            return 0
+        added = 0
+        with self.index.update_lock:
+            model = model_registry.resolve('embedding')
+            if self.index.model != model:
+                print(f"Rebuilding the research index for {model} (was {self.index.model})")
+                self.index.reset(model)
+            rows = get_research_after(self.index.max_id(), db_path=self.db_path)
+            for start in range(0, len(rows), EMBEDDING_BATCH_SIZE):
+                batch = rows[start:start + EMBEDDING_BATCH_SIZE]
+                try:
+                    vectors = embed_texts([content for _, content in batch], priority=BACKGROUND, model=model)
+                except Exception as e:
+                    print(f"Error embedding research rows from {batch[0][0]}: {e}")
+                    return added  # keep ids contiguous; the rest is retried next time
+                added += self.index.add([row_id for row_id, _ in batch], vectors)
+            self.index.mark_complete()
+        return added
+
+    def refresh_research(self, crop: str, location: str) -> List[Dict]:
+        """Scrape the extension sites for a topic and store what was found"""
         practices = []
         
         # Example of ethical scraping from public agricultural extension websites
@@ -50,73 +140,63 @@ class ResearchAgent:
             "https://extension.psu.edu/"
         ]
 
+        # Fetched concurrently; robots.txt and per-host rate limits are
+        # enforced by the crawler
+        responses = self.crawler.fetch_all(sources)
+
         for source in sources:
+            response = responses.get(source)
+            if response is None or response.status_code != 200:
+                continue
             try:
-                # Respect robots.txt and add delay
-                time.sleep(random.uniform(2, 5))
-                
-                response = requests.get(source, headers=self.headers)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                for practice in self._parse_practices(source, response.text):
+                    practices.append(practice)
                     
-                    # Extract relevant information (example implementation)
-                    articles = soup.find_all('article', class_='sustainable-practice')
-                    for article in articles:
-                        title = article.find('h2').text if article.find('h2') else "Untitled"
-                        content = article.find('div', class_='content').text if article.find('div', class_='content') else ""
-                        
-                        practice = {
-                            'title': title,
-                            'content': content,
-                            'source': source
-                        }
-                        practices.append(practice)
-                        
-                        # Store in database
-                        self._store_research(crop, location, practice)
+                    # Store in database
+                    self._store_research(crop, location, practice)
             except Exception as e:
                 print(f"Error scraping {source}: {str(e)}")
                 continue
 
+        # New rows become searchable without rebuilding the index
+        self.index_research()
         return practices
 
-    def _get_cached_research(self, crop: str, location: str) -> List[Dict]:
-        """Retrieve cached research data from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _parse_practices(self, source: str, html: str) -> List[Dict]:
+        """Extract practice articles from an extension site page"""
+        soup = BeautifulSoup(html, 'html.parser')
         
-        cursor.execute('''
-            SELECT topic, source, content, date_collected 
-            FROM research_data 
-            WHERE topic = ? AND date_collected > datetime('now', '-7 days')
-        ''', (f"{crop}_{location}",))
-        
-        results = cursor.fetchall()
-        conn.close()
+        # Extract relevant information (example implementation)
+        practices = []
+        articles = soup.find_all('article', class_='sustainable-practice')
+        for article in articles:
+            title = article.find('h2').text if article.find('h2') else "Untitled"
+            content = article.find('div', class_='content').text if article.find('div', class_='content') else ""
+            
+            practices.append({
+                'title': title,
+                'content': content,
+                'source': source
+            })
+        return practices
+
+    def _get_cached_research(self, crop: str, location: str) -> Tuple[List[Dict], bool]:
+        """Retrieve cached research data from database, and whether any of it is fresh"""
+        results = get_research(f"{crop}_{location}", RESEARCH_MAX_AGE_DAYS, db_path=self.db_path)
+        fresh = [row for row in results if row[4]]
         
+        # Serve the fresh rows when there are any, otherwise everything we have
         return [{
             'title': row[0],
             'source': row[1],
             'content': row[2],
             'date_collected': row[3]
-        } for row in results]
+        } for row in (fresh or results)], bool(fresh)
 
-    def _store_research(self, crop: str, location: str, practice: Dict):
-        """Store research data in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT INTO research_data (topic, source, content)
-                VALUES (?, ?, ?)
-            ''', (f"{crop}_{location}", practice['source'], practice['content']))
-            conn.commit()
-        except sqlite3.IntegrityError:
-            # Skip if already exists
-            pass
-        finally:
-            conn.close()
+    def _store_research(self, crop: str, location: str, practice: Dict) -> int:
+        """Store research data in database and return the row id"""
+        # Duplicates just have their collection time refreshed
+        return store_research(f"{crop}_{location}", practice['source'], practice['content'], db_path=self.db_path)
 
     def get_water_conservation_tips(self, location: str) -> List[Dict]:
         """Get water conservation tips specific to a location"""
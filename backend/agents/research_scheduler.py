@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+from database.repository import get_topics_due
+
+RESEARCH_MAX_AGE_DAYS = int(os.getenv("RESEARCH_MAX_AGE_DAYS", "7"))
+# Topics are refreshed this many hours before they would go stale
+RESEARCH_REFRESH_AHEAD_HOURS = float(os.getenv("RESEARCH_REFRESH_AHEAD_HOURS", "24"))
+# Seconds between scans for topics that are due
+RESEARCH_SCAN_INTERVAL = float(os.getenv("RESEARCH_SCAN_INTERVAL", "900"))
+# Minimum seconds between two scrapes of the same topic (e.g. one that keeps finding nothing)
+RESEARCH_RETRY_INTERVAL = float(os.getenv("RESEARCH_RETRY_INTERVAL", "3600"))
+RESEARCH_REFRESH_WORKERS = int(os.getenv("RESEARCH_REFRESH_WORKERS", "2"))
+
+
+def topic_key(crop: str, location: str) -> str:
+    return f"{crop}_{location}"
+
+
+class ResearchRefresher:
+    """Keeps research_data fresh in the background (stale-while-revalidate).
+
+    Requests call request_refresh() and return whatever is cached right away.
+    Concurrent refreshes of one topic share a single scrape, and a periodic scan
+    re-scrapes known topics shortly before they expire.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str, str], object],
+        db_path: str,
+        scan_interval: float = RESEARCH_SCAN_INTERVAL,
+        retry_interval: float = RESEARCH_RETRY_INTERVAL,
+        workers: int = RESEARCH_REFRESH_WORKERS
+    ):
+        self.refresh = refresh
+        self.db_path = db_path
+        self.scan_interval = scan_interval
+        self.retry_interval = retry_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research")
+        self._inflight: Dict[str, Future] = {}
+        self._attempted: Dict[str, float] = {}
+        self._topics: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def request_refresh(self, crop: str, location: str, force: bool = False):
+        """Schedule a scrape for a topic unless one is running or ran recently.
+
+        Returns the Future of the (possibly shared) scrape, or None if skipped.
+        """
+        topic = topic_key(crop, location)
+        with self._lock:
+            self._topics[topic] = (crop, location)
+            if topic in self._inflight:
+                return self._inflight[topic]
+            last = self._attempted.get(topic)
+            if not force and last and time.monotonic() - last < self.retry_interval:
+                return None
+            self._attempted[topic] = time.monotonic()
+            future = self._executor.submit(self._run, topic, crop, location)
+            self._inflight[topic] = future
+            return future
+
+    def _run(self, topic: str, crop: str, location: str):
+        try:
+            return self.refresh(crop, location)
+        except Exception as e:
+            print(f"Error refreshing research for {topic}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(topic, None)
+
+    def refresh_due(self) -> int:
+        """Schedule every known topic that will go stale within the refresh-ahead window"""
+        due_hours = RESEARCH_MAX_AGE_DAYS * 24 - RESEARCH_REFRESH_AHEAD_HOURS
+        scheduled = 0
+        for topic in get_topics_due(due_hours, db_path=self.db_path):
+            with self._lock:
+                known = self._topics.get(topic)
+            if known:
+                crop, location = known
+            else:
+                # Topics stored before a restart are only known by their key
+                crop, _, location = topic.partition('_')
+            if self.request_refresh(crop, location):
+                scheduled += 1
+        return scheduled
+
+    def _loop(self):
+        while not self._stop.wait(self.scan_interval):
+            try:
+                scheduled = self.refresh_due()
+                if scheduled:
+                    print(f"Scheduled background refresh for {scheduled} research topics")
+            except Exception as e:
+                print(f"Error scanning research topics: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="research-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
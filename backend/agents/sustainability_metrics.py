@@ -1,7 +1,13 @@
-import ollama
+from utils.llm import chat
+from utils.model_registry import model_registry
 from utils.prompt_templates import SUSTAINABILITY_PROMPT_TEMPLATE
 
 def evaluate_sustainability(crop, soil_type):
-    prompt = SUSTAINABILITY_PROMPT_TEMPLATE.format(crop=crop, soil_type=soil_type)
-    response = ollama.chat(model="gemma", messages=[{"role": "user", "content": prompt}])
+    # The template ends with the input, so its instructions are a shared prefix
+    prompt = SUSTAINABILITY_PROMPT_TEMPLATE.format(input=f"crop: {crop}, soil type: {soil_type}")
+    response = chat(
+        model=model_registry.resolve('sustainability_evaluation'),
+        messages=[{"role": "user", "content": prompt}],
+        **model_registry.request_options('sustainability_evaluation')
+    )
     return response['message']['content']
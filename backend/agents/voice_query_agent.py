@@ -1,21 +1,101 @@
-from ollama import Chat
-from utils.prompt_templates import VOICE_PROMPT
-from .farmer_advisor import get_farm_advice
-from .market_researcher import get_market_analysis
-from .sustainability_metrics import get_sustainability_metrics
+import os
+import threading
+from typing import Any, Dict, Tuple
+from utils.intent_classifier import intent_classifier
+from utils.llm import chat
+from utils.model_registry import model_registry
+from utils.prompt_templates import INTENT_SYSTEM_PROMPT
+from utils.query_parsing import AdviceQuery, tokenize
 
-llm = Chat(model="flan-t5")  # Good for understanding queries
+# Below this posterior the local classifier defers to the model
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
 
-def handle_voice_query(user_input):
-    # Ask the model to classify the intent
-    response = llm.chat(messages=[
-        {"role": "user", "content": f"What kind of query is this?\n{user_input}\nRespond with one word: 'farming', 'market', or 'sustainability'"}
-    ])
+INTENTS = ('farming', 'market', 'sustainability')
+
+# Details each intent's agent needs, as (field, how to ask for it)
+INTENT_FIELDS = {
+    'farming': (('location', 'location'), ('crop', 'crop'), ('soil_type', 'soil type')),
+    'market': (('location', 'location'), ('crop', 'crop')),
+    'sustainability': (('crop', 'crop'), ('soil_type', 'soil type')),
+}
+
+_stats = {"local": 0, "llm": 0, "llm_errors": 0}
+_stats_lock = threading.Lock()
+_agents: Dict[str, Any] = {}
+_agents_lock = threading.Lock()
+
+def use_agents(**agents):
+    """Share the app's agents (farmer_advisor=..., market_researcher=...) instead of building more"""
+    with _agents_lock:
+        _agents.update(agents)
+
+def _agent(name):
+    """Agents are built on first use; they warm models and start background work"""
+    with _agents_lock:
+        if name not in _agents:
+            if name == 'farmer_advisor':
+                from agents.farmer_advisor import FarmerAdvisor
+                _agents[name] = FarmerAdvisor()
+            else:
+                from agents.market_researcher import MarketResearcher
+                _agents[name] = MarketResearcher()
+        return _agents[name]
+
+def _llm_intent(user_input) -> str:
+    response = chat(model=model_registry.resolve('intent_classification'), messages=[
+        {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+        {"role": "user", "content": user_input}
+    ], **model_registry.request_options('intent_classification'))
     intent = response['message']['content'].lower()
+    return next((name for name in ('market', 'sustainability') if name in intent), 'farming')
 
-    if "market" in intent:
-        return get_market_analysis(user_input)
-    elif "sustainability" in intent:
-        return get_sustainability_metrics(user_input)
+def classify_intent(user_input) -> Tuple[str, float, str]:
+    """Return (intent, confidence, classified_by); the model is only asked when the local classifier is unsure"""
+    intent, confidence = intent_classifier.predict(user_input)
+    source = 'local'
+    if confidence < INTENT_CONFIDENCE_THRESHOLD:
+        try:
+            intent = _llm_intent(user_input)
+            source = 'llm'
+        except Exception as e:
+            # Overloaded or Ollama down: the local guess beats no answer
+            print(f"Intent model unavailable, keeping local intent {intent}: {e}")
+            with _stats_lock:
+                _stats["llm_errors"] += 1
+    with _stats_lock:
+        _stats[source] += 1
+    return intent, confidence, source
+
+def router_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        total = _stats["local"] + _stats["llm"]
+        return {
+            "classified_locally": _stats["local"],
+            "llm_fallbacks": _stats["llm"],
+            "fallback_rate": _stats["llm"] / total if total else 0.0,
+            "llm_errors": _stats["llm_errors"],
+        }
+
+def _fields(user_input) -> Dict[str, str]:
+    """Pick out any "key: value" details the query carries, as database labels"""
+    return {key: value for key, value in AdviceQuery.create(**tokenize(user_input)).as_kwargs().items() if value}
+
+def handle_voice_query(user_input):
+    intent, confidence, source = classify_intent(user_input)
+    fields = _fields(user_input)
+    missing = [(name, label) for name, label in INTENT_FIELDS[intent] if not fields.get(name)]
+
+    if missing:
+        # Details are only read from "key: value" pairs in the query
+        result = {"error": "Please mention your {} as \"{}\"".format(
+            ' and '.join(label for _, label in missing), ', '.join(f"{name}: ..." for name, _ in missing)
+        )}
+    elif intent == "market":
+        result = _agent('market_researcher').get_market_trends(fields['location'], fields['crop'])
+    elif intent == "sustainability":
+        from agents.sustainability_metrics import evaluate_sustainability
+        result = evaluate_sustainability(fields['crop'], fields['soil_type'])
     else:
-        return get_farm_advice(user_input)
+        result = _agent('farmer_advisor').get_farm_advice(**fields)
+
+    return {"intent": intent, "confidence": confidence, "classified_by": source, "result": result}
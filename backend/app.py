@@ -1,55 +1,56 @@
 # backend/app.py
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from agents.farmer_advisor import FarmerAdvisor
 from agents.market_researcher import MarketResearcher
 from agents.sustainability_metrics import evaluate_sustainability
+from agents.voice_query_agent import handle_voice_query, router_stats, use_agents
+from database.migrations import apply_migrations
+from utils.embeddings import embedding_cache
+from utils.llm import prefill_stats, response_cache
+from utils.llm_scheduler import Overloaded, llm_scheduler
+from utils.query_parsing import AdviceQuery, QueryError
 
 app = Flask(__name__)
 CORS(app)
 
+# Bring the database schema up to date before serving
+try:
+    apply_migrations()
+except Exception as e:
+    print(f"Error applying database migrations: {e}")
+
 # Initialize agents
 farmer_advisor = FarmerAdvisor()
 market_researcher = MarketResearcher()
+use_agents(farmer_advisor=farmer_advisor, market_researcher=market_researcher)
+
+@app.errorhandler(Overloaded)
+def overloaded_handler(e):
+    # Shed load quickly; clients should retry shortly
+    response = jsonify({"error": str(e)})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def _ndjson(events):
+    """Serialize agent events as newline-delimited JSON for a streamed response"""
+    for event in events:
+        yield json.dumps(event, default=str) + "\n"
 
 @app.route('/query', methods=['POST'])
 def query_handler():
-    user_input = request.json.get("input")
-    if not user_input:
-        return jsonify({"error": "Missing input parameter"})
+    try:
+        # JSON fields or the legacy "key: value, ..." string
+        query = AdviceQuery.from_payload(request.json)
+    except QueryError as e:
+        return jsonify({"error": str(e)})
+    llm_scheduler.admit()
     
     try:
-        # Parse the input string into a structured format
-        input_parts = user_input.split(', ')
-        input_dict = {}
-        for part in input_parts:
-            key, value = part.split(': ', 1)
-            input_dict[key.lower().replace(' ', '_')] = value
-        
-        # Extract required parameters
-        location = input_dict.get('location')
-        crop = input_dict.get('crop')
-        soil_type = input_dict.get('soil_type')
-        
-        if not all([location, crop, soil_type]):
-            return jsonify({"error": "Missing required parameters: location, crop, and soil_type"})
-        
-        # Get additional parameters
-        season = input_dict.get('season', '')
-        water_availability = input_dict.get('water_availability', '')
-        previous_crop = input_dict.get('previous_crop', '')
-        pest_issues = input_dict.get('pest_issues', '')
-        
         # Get the advice
-        result = farmer_advisor.get_farm_advice(
-            location=location,
-            crop=crop,
-            soil_type=soil_type,
-            season=season,
-            water_availability=water_availability,
-            previous_crop=previous_crop,
-            pest_issues=pest_issues
-        )
+        # "mode": "sections" (default) or "single_pass"
+        result = farmer_advisor.get_farm_advice(**query.as_kwargs(), mode=request.json.get('mode'))
 
         if "error" in result:
             return jsonify({"error": result["error"]})
@@ -58,27 +59,78 @@ def query_handler():
         response = {
             "advice": result.get("advice", ""),
             "metrics": result.get("metrics", {}),
-            "research_sources": result.get("research_sources", [])
+            "research_sources": result.get("research_sources", []),
+            "unavailable_sections": result.get("unavailable_sections", {}),
+            "semantic_cache": result.get("semantic_cache", {"hit": False, "similarity": None}),
+            "mode": result.get("mode")
         }
 
         print("Sending response:", response)  # Debug log
         return jsonify(response)
 
+    except Overloaded:
+        # Served by overloaded_handler
+        raise
     except Exception as e:
         print("Error in query_handler:", str(e))  # Debug log
         return jsonify({"error": str(e)})
 
+@app.route('/query/stream', methods=['POST'])
+def query_stream_handler():
+    try:
+        query = AdviceQuery.from_payload(request.json)
+    except QueryError as e:
+        return jsonify({"error": str(e)})
+
+    llm_scheduler.admit()
+    return Response(
+        stream_with_context(_ndjson(farmer_advisor.stream_farm_advice(**query.as_kwargs()))),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/market', methods=['POST'])
 def market_handler():
     region = request.json.get("region")
     crop = request.json.get("crop")
+    llm_scheduler.admit()
     return jsonify({"market_info": market_researcher.get_market_trends(region, crop)})
 
+@app.route('/market/stream', methods=['POST'])
+def market_stream_handler():
+    region = request.json.get("region")
+    crop = request.json.get("crop")
+    llm_scheduler.admit()
+    return Response(
+        stream_with_context(_ndjson(market_researcher.stream_market_trends(region, crop))),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/sustainability', methods=['POST'])
 def sustainability_handler():
     crop = request.json.get("crop")
     soil = request.json.get("soil")
+    llm_scheduler.admit()
     return jsonify({"sustainability": evaluate_sustainability(crop, soil)})
 
+@app.route('/voice_query', methods=['POST'])
+def voice_query_handler():
+    user_input = request.json.get("input") if isinstance(request.json, dict) else None
+    if not isinstance(user_input, str) or not user_input.strip():
+        return jsonify({"error": "Missing input parameter"})
+    llm_scheduler.admit()
+    return jsonify(handle_voice_query(user_input))
+
+@app.route('/metrics', methods=['GET'])
+def metrics_handler():
+    return jsonify({
+        "llm_cache": response_cache.stats(),
+        "advice_coalescing": farmer_advisor.inflight.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_prefill": prefill_stats.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "semantic_cache": farmer_advisor.semantic_cache.stats() if farmer_advisor.semantic_cache else None,
+        "intent_router": router_stats()
+    })
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,102 @@
+# backend/database/aggregates.py
+
+from typing import Dict, Optional
+import pandas as pd
+from database.connection import DB_PATH, query_one
+
+# Raw table -> (aggregate table, grouping column, metric columns).
+# Each aggregate row holds per-day sums and non-null counts, so a mean over
+# any window is SUM(sum) / SUM(count) across at most one row per day.
+AGGREGATES = {
+    'farming_conditions': (
+        'farming_daily_aggregates',
+        'crop_type',
+        ['sustainability_score', 'fertilizer_usage', 'pesticide_usage', 'crop_yield'],
+    ),
+    'market_conditions': (
+        'market_daily_aggregates',
+        'product',
+        ['demand_index', 'weather_impact_score'],
+    ),
+}
+
+
+def _metric_columns(metrics):
+    return [f"{metric}_{part}" for metric in metrics for part in ('sum', 'count')]
+
+
+def create_table_sql(table: str) -> str:
+    aggregate_table, key, metrics = AGGREGATES[table]
+    columns = ",\n        ".join(
+        f"{column} {'FLOAT' if column.endswith('_sum') else 'INTEGER'} NOT NULL DEFAULT 0"
+        for column in _metric_columns(metrics)
+    )
+    return f"""
+    CREATE TABLE IF NOT EXISTS {aggregate_table} (
+        {key} TEXT NOT NULL,
+        day DATE NOT NULL,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        {columns},
+        PRIMARY KEY ({key}, day)
+    ) WITHOUT ROWID
+    """
+
+
+def backfill_sql(table: str) -> str:
+    """Recompute an aggregate table from its raw table"""
+    aggregate_table, key, metrics = AGGREGATES[table]
+    selects = ", ".join(f"TOTAL({metric}), COUNT({metric})" for metric in metrics)
+    return f"""
+    INSERT OR REPLACE INTO {aggregate_table} ({key}, day, row_count, {', '.join(_metric_columns(metrics))})
+    SELECT {key}, date_recorded, COUNT(*), {selects}
+    FROM {table}
+    WHERE {key} IS NOT NULL AND date_recorded IS NOT NULL
+    GROUP BY {key}, date_recorded
+    """
+
+
+def _upsert_sql(table: str) -> str:
+    aggregate_table, key, metrics = AGGREGATES[table]
+    columns = ['row_count'] + _metric_columns(metrics)
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns)
+    return f"""
+    INSERT INTO {aggregate_table} ({key}, day, {', '.join(columns)})
+    VALUES ({', '.join('?' for _ in range(len(columns) + 2))})
+    ON CONFLICT ({key}, day) DO UPDATE SET {updates}
+    """
+
+
+def has_aggregates(conn, table: str) -> bool:
+    """Whether the aggregate table for a raw table exists yet (it is created by a migration)"""
+    aggregate_table = AGGREGATES[table][0]
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (aggregate_table,)
+    ).fetchone() is not None
+
+
+def update_aggregates(conn, table: str, rows: pd.DataFrame):
+    """Fold newly inserted raw rows (table column names) into the daily aggregates"""
+    _, key, metrics = AGGREGATES[table]
+    grouped = rows.groupby([key, 'date_recorded'])
+    summary = pd.concat(
+        [grouped.size().rename('row_count')] +
+        [part for metric in metrics for part in (
+            grouped[metric].sum().rename(f"{metric}_sum"),
+            grouped[metric].count().rename(f"{metric}_count"),
+        )],
+        axis=1
+    ).reset_index()
+    values = [summary[column].tolist() for column in summary.columns]
+    conn.executemany(_upsert_sql(table), zip(*values))
+
+
+def fetch_daily_means(table: str, key_value: str, date_range: int = 30, db_path: str = DB_PATH) -> Dict[str, Optional[float]]:
+    """Mean of each metric over the last date_range days, answered from the aggregates"""
+    aggregate_table, key, metrics = AGGREGATES[table]
+    selects = ", ".join(f"SUM({metric}_sum) / SUM({metric}_count)" for metric in metrics)
+    row = query_one(
+        f"SELECT {selects} FROM {aggregate_table} WHERE {key} = ? AND day >= date('now', ?)",
+        (key_value, f'-{date_range} days'),
+        db_path=db_path
+    )
+    return dict(zip(metrics, row))
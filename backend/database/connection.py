@@ -0,0 +1,154 @@
+# backend/database/connection.py
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import pandas as pd
+
+DB_PATH = os.getenv("DB_PATH", "farming_data.db")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Applied to every pooled connection. WAL lets readers run alongside the
+# single writer; the cache and mmap sizes keep hot pages out of read() calls.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,        # 64 MB (negative means KiB)
+    "mmap_size": 268435456,      # 256 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms
+}
+
+# Prepared statements kept per connection, so hot queries are parsed once
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by all request threads"""
+
+    def __init__(self, db_path: str = DB_PATH, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,  # a connection is only ever used by one thread at a time
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                # Never hand the next borrower a half-finished transaction
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection; borrowed ones are released once the pool is dropped"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path)
+        return _pools[db_path]
+
+
+def connection(db_path: str = DB_PATH):
+    """Context manager yielding a pooled connection"""
+    return get_pool(db_path).connection()
+
+
+@contextmanager
+def transaction(db_path: str = DB_PATH):
+    """Pooled connection wrapped in a transaction: commit on success, rollback on error"""
+    with connection(db_path) as conn:
+        with conn:
+            yield conn
+
+
+def query_df(query: str, params: Sequence[Any] = (), db_path: str = DB_PATH) -> pd.DataFrame:
+    with connection(db_path) as conn:
+        return pd.read_sql_query(query, conn, params=list(params))
+
+
+def query_all(query: str, params: Sequence[Any] = (), db_path: str = DB_PATH) -> List[tuple]:
+    with connection(db_path) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def query_one(query: str, params: Sequence[Any] = (), db_path: str = DB_PATH) -> Optional[tuple]:
+    with connection(db_path) as conn:
+        return conn.execute(query, params).fetchone()
+
+
+def execute(query: str, params: Sequence[Any] = (), db_path: str = DB_PATH) -> int:
+    with transaction(db_path) as conn:
+        return conn.execute(query, params).rowcount
+
+
+def executemany(query: str, rows: Iterable[Sequence[Any]], db_path: str = DB_PATH) -> int:
+    with transaction(db_path) as conn:
+        return conn.executemany(query, rows).rowcount
+
+
+def close_all():
+    """Close pooled connections, e.g. before the database file is replaced"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -1,30 +1,186 @@
-import sqlite3
-
-def get_advice_from_db(location=None, soil_type=None, crop=None, budget=None, land_size=None):
-    conn = sqlite3.connect('farming_data.db')
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM farmer_advisor WHERE 1=1"
-    params = []
-
-    if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
-    if soil_type:
-        query += " AND soil_type LIKE ?"
-        params.append(f"%{soil_type}%")
-    if crop:
-        query += " AND recommended_crop LIKE ?"
-        params.append(f"%{crop}%")
+import heapq
+import unicodedata
+from database.connection import DB_PATH, connection, transaction
+
+# Filterable text columns of farmer_advisor. They hold a handful of distinct
+# values ("Haryana, India", "Sandy Loam"), so filters are matched word by word
+# against those values through a small token table, and rows are then fetched
+# by exact value through expression indexes.
+ADVICE_TEXT_FILTERS = {
+    'location': 'location',
+    'soil_type': 'soil_type',
+    'crop': 'recommended_crop',
+}
+
+DEFAULT_PAGE_SIZE = 20
+
+# Sorts after every token that starts with a given prefix
+_PREFIX_END = '\U0010ffff'
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _normalized(column):
+    """SQL for a column's lookup key; the query must use the same expression to hit the index"""
+    return f"lower(trim({column}))"
+
+def _tokens(text):
+    """Canonical words of a value: case and diacritics folded, punctuation dropped"""
+    text = unicodedata.normalize('NFKD', str(text or '')).casefold()
+    return ''.join(' ' if not ch.isalnum() else ch for ch in text if not unicodedata.combining(ch)).split()
+
+def build_advice_index(db_path=DB_PATH):
+    """(Re)build the lookup indexes and token table over farmer_advisor's text columns.
+
+    Call after the table is (re)loaded or gains new location, soil or crop
+    values: replacing the table drops its indexes, and the token table only
+    knows the values present when it was built. Returns the indexed columns.
+    """
+    with transaction(db_path) as conn:
+        # DDL does not open a transaction implicitly; rebuild atomically
+        conn.execute("BEGIN")
+        # Superseded full-text index and its sync triggers
+        for trigger in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER IF EXISTS farmer_advisor_fts_{trigger}")
+        conn.execute("DROP TABLE IF EXISTS farmer_advisor_fts")
+
+        table_columns = _table_columns(conn, 'farmer_advisor')
+        columns = [c for c in ADVICE_TEXT_FILTERS.values() if c in table_columns]
+        if not columns:
+            print("farmer_advisor has no text columns to index")
+        for column in columns:
+            conn.execute(f"DROP INDEX IF EXISTS idx_farmer_advisor_{column}_key")
+            # Entries are ordered by (key, rowid), so an equality lookup
+            # returns rows in rowid order and a page stops after LIMIT rows
+            conn.execute(
+                f"CREATE INDEX idx_farmer_advisor_{column}_key ON farmer_advisor ({_normalized(column)})"
+            )
+        if len(columns) > 1:
+            # The usual request filters on all of them at once
+            conn.execute("DROP INDEX IF EXISTS idx_farmer_advisor_keys")
+            conn.execute(
+                f"CREATE INDEX idx_farmer_advisor_keys ON farmer_advisor "
+                f"({', '.join(_normalized(column) for column in columns)})"
+            )
+
+        # One row per (column, word, distinct value); value is the lookup key
+        conn.execute("DROP TABLE IF EXISTS farmer_advisor_terms")
+        conn.execute("""
+            CREATE TABLE farmer_advisor_terms (
+                column_name TEXT NOT NULL,
+                token TEXT NOT NULL,
+                value TEXT NOT NULL,
+                value_tokens INTEGER NOT NULL,
+                PRIMARY KEY (column_name, token, value)
+            ) WITHOUT ROWID
+        """)
+        for column in columns:
+            values = conn.execute(
+                f"SELECT DISTINCT {_normalized(column)} FROM farmer_advisor WHERE {column} IS NOT NULL"
+            ).fetchall()
+            conn.executemany(
+                "INSERT OR IGNORE INTO farmer_advisor_terms VALUES (?, ?, ?, ?)",
+                [(column, token, value, len(tokens))
+                 for (value,) in values for tokens in [_tokens(value)] for token in tokens]
+            )
+        if columns:
+            # Lets the planner lead with the most selective filter
+            conn.execute("ANALYZE farmer_advisor")
+    return columns
+
+def _ranked_values(conn, column, text):
+    """Values of a column containing every word of text (as a word prefix), best first.
+
+    An exact match ranks first, then values with fewer extra words, so
+    "haryana" prefers "Haryana" to "Haryana, India" to "North Haryana Plains".
+    """
+    tokens = _tokens(text)
+    matches = None
+    for token in tokens:
+        rows = conn.execute(
+            "SELECT value, value_tokens FROM farmer_advisor_terms "
+            "WHERE column_name = ? AND token >= ? AND token < ?",
+            (column, token, token + _PREFIX_END)
+        ).fetchall()
+        found = dict(rows)
+        matches = found if matches is None else {v: n for v, n in matches.items() if v in found}
+    return sorted((matches or {}).items(), key=lambda item: (item[1] - len(tokens), item[0]))
+
+def _combinations(ranked):
+    """Yield one value per column, lowest summed rank first, without building the full product"""
+    start = (0,) * len(ranked)
+    heap, seen = [(0, start)], {start}
+    while heap:
+        rank, positions = heapq.heappop(heap)
+        yield tuple(values[i][0] for values, i in zip(ranked, positions))
+        for n in range(len(positions)):
+            following = positions[:n] + (positions[n] + 1,) + positions[n + 1:]
+            if following[n] < len(ranked[n]) and following not in seen:
+                seen.add(following)
+                heapq.heappush(heap, (rank + 1, following))
+
+def _terms_ready(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'farmer_advisor_terms'"
+    ).fetchone() is not None
+
+def get_advice_from_db(location=None, soil_type=None, crop=None, budget=None, land_size=None,
+                       limit=DEFAULT_PAGE_SIZE, offset=0, db_path=DB_PATH):
+    """Return one page of farmer_advisor rows matching the filters, best matches first.
+
+    Every word of a text filter must start a word of the column, ignoring
+    case, accents and punctuation. Rows are grouped by how closely their
+    values match and kept in table order within a group.
+    """
+    values = {'location': location, 'soil_type': soil_type, 'crop': crop}
+    filters = {ADVICE_TEXT_FILTERS[key]: value for key, value in values.items() if value}
+    numeric, numeric_params = "", []
     if budget:
-        query += " AND budget <= ?"
-        params.append(budget)
+        numeric += " AND budget <= ?"
+        numeric_params.append(budget)
     if land_size:
-        query += " AND land_size >= ?"
-        params.append(land_size)
+        numeric += " AND land_size >= ?"
+        numeric_params.append(land_size)
+
+    with connection(db_path) as conn:
+        if not filters:
+            return conn.execute(
+                f"SELECT * FROM farmer_advisor WHERE 1=1{numeric} ORDER BY rowid LIMIT ? OFFSET ?",
+                [*numeric_params, limit, offset]
+            ).fetchall()
+
+        if not _terms_ready(conn):
+            # Index not built yet: substring scans, unranked
+            query = "SELECT * FROM farmer_advisor WHERE 1=1"
+            params = []
+            for column, value in filters.items():
+                query += f" AND {column} LIKE ?"
+                params.append(f"%{value}%")
+            return conn.execute(
+                f"{query}{numeric} ORDER BY rowid LIMIT ? OFFSET ?", [*params, *numeric_params, limit, offset]
+            ).fetchall()
 
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
+        ranked = [_ranked_values(conn, column, value) for column, value in filters.items()]
+        if not all(ranked):
+            return []
+        where = ' AND '.join(f"{_normalized(column)} = ?" for column in filters) + numeric
 
-    return results
+        # Each combination of values is one indexed equality lookup; walk
+        # them best first until the page is full
+        rows = []
+        for combination in _combinations(ranked):
+            if len(rows) >= limit:
+                break
+            params = [*combination, *numeric_params]
+            page = conn.execute(
+                f"SELECT * FROM farmer_advisor WHERE {where} ORDER BY rowid LIMIT ? OFFSET ?",
+                [*params, limit - len(rows), offset]
+            ).fetchall()
+            if offset:
+                if not page:
+                    # The whole combination lies before the requested page
+                    offset -= conn.execute(f"SELECT COUNT(*) FROM farmer_advisor WHERE {where}", params).fetchone()[0]
+                    continue
+                offset = 0
+            rows.extend(page)
+        return rows
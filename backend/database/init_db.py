@@ -1,16 +1,146 @@
-import sqlite3
 import os
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+from database.aggregates import has_aggregates, update_aggregates
+from database.connection import DB_PATH, close_all, transaction
+from database.migrations import apply_migrations
 
-DB_PATH = "farming_data.db"
+FARMER_CSV = 'database/farmer_advisor_dataset.csv'
+MARKET_CSV = 'database/market_researcher_dataset.csv'
+
+# Rows per chunk when streaming a CSV into the database
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50000"))
+
+# CSV column -> table column, and the dtype each CSV column is parsed as
+FARMING_COLUMNS = {
+    'Farm_ID': 'farm_id',
+    'Soil_pH': 'soil_ph',
+    'Soil_Moisture': 'soil_moisture',
+    'Temperature_C': 'temperature',
+    'Rainfall_mm': 'rainfall',
+    'Crop_Type': 'crop_type',
+    'Fertilizer_Usage_kg': 'fertilizer_usage',
+    'Pesticide_Usage_kg': 'pesticide_usage',
+    'Crop_Yield_ton': 'crop_yield',
+    'Sustainability_Score': 'sustainability_score',
+}
+FARMING_DTYPES = {
+    'Farm_ID': 'int64',
+    'Soil_pH': 'float64',
+    'Soil_Moisture': 'float64',
+    'Temperature_C': 'float64',
+    'Rainfall_mm': 'float64',
+    'Crop_Type': 'object',
+    'Fertilizer_Usage_kg': 'float64',
+    'Pesticide_Usage_kg': 'float64',
+    'Crop_Yield_ton': 'float64',
+    'Sustainability_Score': 'float64',
+}
+
+MARKET_COLUMNS = {
+    'Market_ID': 'market_id',
+    'Product': 'product',
+    'Market_Price_per_ton': 'market_price',
+    'Demand_Index': 'demand_index',
+    'Supply_Index': 'supply_index',
+    'Competitor_Price_per_ton': 'competitor_price',
+    'Economic_Indicator': 'economic_indicator',
+    'Weather_Impact_Score': 'weather_impact_score',
+    'Seasonal_Factor': 'seasonal_factor',
+    'Consumer_Trend_Index': 'consumer_trend_index',
+}
+MARKET_DTYPES = {
+    'Market_ID': 'int64',
+    'Product': 'object',
+    'Market_Price_per_ton': 'float64',
+    'Demand_Index': 'float64',
+    'Supply_Index': 'float64',
+    'Competitor_Price_per_ton': 'float64',
+    'Economic_Indicator': 'float64',
+    'Weather_Impact_Score': 'float64',
+    'Seasonal_Factor': 'object',
+    'Consumer_Trend_Index': 'float64',
+}
+
+def _count_rows(csv_path):
+    """Count data rows without parsing the file"""
+    with open(csv_path, 'rb') as f:
+        lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            lines += 1  # last line has no trailing newline
+    return max(lines - 1, 0)
+
+def load_csv(conn, csv_path, table, columns, dtypes, chunksize=INGEST_CHUNK_SIZE):
+    """Stream a CSV into table in chunks with executemany.
+
+    Runs inside the caller's transaction, so memory use is bounded by the
+    chunk size rather than the file size. CSVs without a Date_Recorded
+    column get one synthesized, one day per row, ending today. Each chunk
+    is also folded into the table's daily aggregates once they exist.
+    """
+    total = _count_rows(csv_path)
+    start = np.datetime64(datetime.now().date()) - np.timedelta64(total, 'D')
+    has_dates = 'Date_Recorded' in pd.read_csv(csv_path, nrows=0).columns
+    usecols = list(columns) + (['Date_Recorded'] if has_dates else [])
+
+    insert_sql = f"""
+    INSERT INTO {table} ({', '.join(columns.values())}, date_recorded)
+    VALUES ({', '.join('?' for _ in range(len(columns) + 1))})
+    """
+
+    maintain_aggregates = has_aggregates(conn, table)
+
+    loaded = 0
+    started = time.perf_counter()
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        if has_dates:
+            dates = chunk['Date_Recorded'].tolist()
+        else:
+            offsets = np.arange(loaded, loaded + len(chunk))
+            dates = np.datetime_as_string(start + offsets.astype('timedelta64[D]'), unit='D').tolist()
+
+        # tolist() yields plain Python scalars, which sqlite3 binds directly
+        values = [chunk[column].tolist() for column in columns]
+        conn.executemany(insert_sql, zip(*values, dates))
+        if maintain_aggregates:
+            rows = chunk[list(columns)].rename(columns=columns)
+            rows['date_recorded'] = dates
+            update_aggregates(conn, table, rows)
+        loaded += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    rate = loaded / elapsed if elapsed else float('inf')
+    print(f"Loaded {loaded:,} rows into {table} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return loaded
+
+def ingest_csv(csv_path, table, db_path=DB_PATH, chunksize=INGEST_CHUNK_SIZE):
+    """Append a (possibly very large) dataset to farming_conditions or market_conditions"""
+    columns, dtypes = {
+        'farming_conditions': (FARMING_COLUMNS, FARMING_DTYPES),
+        'market_conditions': (MARKET_COLUMNS, MARKET_DTYPES),
+    }[table]
+    with transaction(db_path) as conn:
+        return load_csv(conn, csv_path, table, columns, dtypes, chunksize)
 
 def init_database():
+    # Pooled connections still point at the old file, so close them first
+    close_all()
+
     # Remove existing database if it exists
     if os.path.exists(DB_PATH):
         os.remove(DB_PATH)
     
-    conn = sqlite3.connect(DB_PATH)
+    # Schema, datasets and sample rows are written in a single transaction
+    with transaction() as conn:
+        _build_database(conn)
+
+    # Indexes and later schema changes
+    apply_migrations()
+
+def _build_database(conn):
     cursor = conn.cursor()
 
     # Create farming_conditions table (from farmer_advisor_dataset)
@@ -61,49 +191,9 @@ def init_database():
     )
     """)
 
-    # Load and insert farmer advisor data
-    farmer_data = pd.read_csv('database/farmer_advisor_dataset.csv')
-    farmer_data['date_recorded'] = pd.date_range(
-        start=datetime.now() - timedelta(days=len(farmer_data)),
-        periods=len(farmer_data)
-    ).strftime('%Y-%m-%d')
-    
-    for _, row in farmer_data.iterrows():
-        cursor.execute("""
-        INSERT INTO farming_conditions (
-            farm_id, soil_ph, soil_moisture, temperature, rainfall,
-            crop_type, fertilizer_usage, pesticide_usage, crop_yield,
-            sustainability_score, date_recorded
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            row['Farm_ID'], row['Soil_pH'], row['Soil_Moisture'],
-            row['Temperature_C'], row['Rainfall_mm'], row['Crop_Type'],
-            row['Fertilizer_Usage_kg'], row['Pesticide_Usage_kg'],
-            row['Crop_Yield_ton'], row['Sustainability_Score'],
-            row['date_recorded']
-        ))
-
-    # Load and insert market researcher data
-    market_data = pd.read_csv('database/market_researcher_dataset.csv')
-    market_data['date_recorded'] = pd.date_range(
-        start=datetime.now() - timedelta(days=len(market_data)),
-        periods=len(market_data)
-    ).strftime('%Y-%m-%d')
-    
-    for _, row in market_data.iterrows():
-        cursor.execute("""
-        INSERT INTO market_conditions (
-            market_id, product, market_price, demand_index, supply_index,
-            competitor_price, economic_indicator, weather_impact_score,
-            seasonal_factor, consumer_trend_index, date_recorded
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            row['Market_ID'], row['Product'], row['Market_Price_per_ton'],
-            row['Demand_Index'], row['Supply_Index'],
-            row['Competitor_Price_per_ton'], row['Economic_Indicator'],
-            row['Weather_Impact_Score'], row['Seasonal_Factor'],
-            row['Consumer_Trend_Index'], row['date_recorded']
-        ))
+    # Bulk load both datasets
+    load_csv(conn, FARMER_CSV, 'farming_conditions', FARMING_COLUMNS, FARMING_DTYPES)
+    load_csv(conn, MARKET_CSV, 'market_conditions', MARKET_COLUMNS, MARKET_DTYPES)
 
     # Insert sample weather data for locations
     locations = ['California', 'Texas', 'Florida', 'New York', 'Washington']
@@ -122,9 +212,7 @@ def init_database():
             'Sunny'  # conditions
         ))
 
-    conn.commit()
-    conn.close()
-
 if __name__ == "__main__":
+    # Run from backend/ as: python -m database.init_db
     init_database()
     print("Database initialized successfully with synthetic data!") 
\ No newline at end of file
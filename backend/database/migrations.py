@@ -0,0 +1,121 @@
+# backend/database/migrations.py
+
+import sys
+from database import aggregates
+from database.connection import DB_PATH, connection, query_all, transaction
+from database.query_interface import (
+    FARMING_CONDITIONS_QUERY,
+    MARKET_CONDITIONS_QUERY,
+    WEATHER_QUERY,
+)
+
+# Ordered schema changes. The database's PRAGMA user_version records the last
+# one applied, so each runs exactly once. Append new migrations; never edit old ones.
+MIGRATIONS = [
+    (1, "Composite indexes for the advice and market hot paths", [
+        "CREATE INDEX IF NOT EXISTS idx_farming_crop_date ON farming_conditions (crop_type, date_recorded)",
+        "CREATE INDEX IF NOT EXISTS idx_farming_date ON farming_conditions (date_recorded)",
+        "CREATE INDEX IF NOT EXISTS idx_market_product_date ON market_conditions (product, date_recorded)",
+        "CREATE INDEX IF NOT EXISTS idx_market_date ON market_conditions (date_recorded)",
+        "CREATE INDEX IF NOT EXISTS idx_weather_location_date ON weather_forecast (location, date)",
+        "ANALYZE",
+    ]),
+    (2, "Per-day rolling aggregates for the sustainability metrics", [
+        aggregates.create_table_sql('farming_conditions'),
+        aggregates.create_table_sql('market_conditions'),
+        aggregates.backfill_sql('farming_conditions'),
+        aggregates.backfill_sql('market_conditions'),
+    ]),
+    (3, "Unique (location, date) key so weather forecasts can be upserted", [
+        # Keep the newest row of any duplicates before enforcing the key
+        """DELETE FROM weather_forecast WHERE id NOT IN (
+            SELECT MAX(id) FROM weather_forecast GROUP BY location, date
+        )""",
+        "DROP INDEX IF EXISTS idx_weather_location_date",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_location_date ON weather_forecast (location, date)",
+    ]),
+    (4, "Per-market price columns so scraped mandi prices can be upserted", [
+        "ALTER TABLE market_conditions ADD COLUMN market TEXT",
+        "ALTER TABLE market_conditions ADD COLUMN min_price FLOAT",
+        "ALTER TABLE market_conditions ADD COLUMN max_price FLOAT",
+        # Dataset rows have no market, and NULLs never collide, so they are unaffected
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_market_product_market_date ON market_conditions (product, market, date_recorded)",
+    ]),
+    (5, "Scraped mandi prices in Rs/ton, like the dataset", [
+        # Only scraped rows have a market; they were stored per quintal
+        """UPDATE market_conditions
+        SET market_price = market_price * 10, min_price = min_price * 10, max_price = max_price * 10
+        WHERE market IS NOT NULL""",
+    ]),
+]
+
+# The queries every advice request runs, with representative parameters
+HOT_QUERIES = {
+    'farming_conditions_by_crop': (FARMING_CONDITIONS_QUERY + " AND crop_type = ?", ['-30 days', 'Wheat']),
+    'farming_conditions_recent': (FARMING_CONDITIONS_QUERY, ['-30 days']),
+    'market_conditions_by_product': (MARKET_CONDITIONS_QUERY + " AND product = ?", ['-30 days', 'Wheat']),
+    'market_conditions_recent': (MARKET_CONDITIONS_QUERY, ['-30 days']),
+    'weather_by_location': (WEATHER_QUERY, ['California', '-7 days']),
+    'farming_daily_means': (
+        "SELECT * FROM farming_daily_aggregates WHERE crop_type = ? AND day >= date('now', ?)",
+        ['Wheat', '-30 days']
+    ),
+    'market_daily_means': (
+        "SELECT * FROM market_daily_aggregates WHERE product = ? AND day >= date('now', ?)",
+        ['Wheat', '-30 days']
+    ),
+}
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when a hot query would scan a whole table"""
+
+
+def schema_version(db_path: str = DB_PATH) -> int:
+    return query_all("PRAGMA user_version", db_path=db_path)[0][0]
+
+
+def apply_migrations(db_path: str = DB_PATH) -> int:
+    """Apply pending migrations in order and return the resulting schema version"""
+    version = schema_version(db_path)
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        with transaction(db_path) as conn:
+            # DDL does not open a transaction implicitly; make each migration atomic
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not accept bound parameters
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+        print(f"Applied migration {number}: {description}")
+        version = number
+    return version
+
+
+def explain(query: str, params, db_path: str = DB_PATH):
+    """Return the detail lines of EXPLAIN QUERY PLAN for a query"""
+    with connection(db_path) as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+
+def check_query_plans(db_path: str = DB_PATH):
+    """Fail if any hot query falls back to a full table scan"""
+    scans = {}
+    for name, (query, params) in HOT_QUERIES.items():
+        plan = explain(query, params, db_path)
+        # Index lookups show up as "SEARCH ...", full scans as "SCAN <table>"
+        full_scans = [step for step in plan if step.startswith('SCAN ')]
+        if full_scans:
+            scans[name] = full_scans
+    if scans:
+        raise QueryPlanError(f"Hot queries fall back to full scans: {scans}")
+    return True
+
+
+if __name__ == "__main__":
+    # Run from backend/ as: python -m database.migrations [--check]
+    print(f"Schema version: {apply_migrations()}")
+    if "--check" in sys.argv:
+        check_query_plans()
+        print("All hot queries use indexes.")
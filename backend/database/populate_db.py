@@ -1,19 +1,24 @@
 import pandas as pd
 import sqlite3
+from database.get_advice_from_db import build_advice_index
 
 def populate_database():
     conn = sqlite3.connect('farming_data.db')
 
     # Load CSVs and save as tables
-    farmer_df = pd.read_csv('farmer_advisor_dataset.csv')
-    market_df = pd.read_csv('market_researcher_dataset.csv')
+    farmer_df = pd.read_csv('database/farmer_advisor_dataset.csv')
+    market_df = pd.read_csv('database/market_researcher_dataset.csv')
 
     farmer_df.to_sql('farmer_advisor', conn, if_exists='replace', index=False)
     market_df.to_sql('market_researcher', conn, if_exists='replace', index=False)
 
     conn.commit()
     conn.close()
+
+    # to_sql(replace) drops the old table, so the search index is rebuilt
+    build_advice_index()
     print("✅ Database populated successfully.")
 
 if __name__ == '__main__':
+    # Run from backend/ as: python -m database.populate_db
     populate_database()
@@ -1,76 +1,105 @@
 # backend/database/query_interface.py
 
-import sqlite3
-import pandas as pd
-from datetime import datetime, timedelta
+import os
+import threading
+import time
+from collections import OrderedDict
+from database.aggregates import fetch_daily_means
+from database.connection import query_df
 
-DB_PATH = "farming_data.db"
-
-def fetch_farming_conditions(crop_type=None, location=None, date_range=30):
-    conn = sqlite3.connect(DB_PATH)
-    query = """
+# Hot queries are kept as constants so each pooled connection prepares them once
+FARMING_CONDITIONS_QUERY = """
     SELECT * FROM farming_conditions 
     WHERE date_recorded >= date('now', ?)
     """
+
+MARKET_CONDITIONS_QUERY = """
+    SELECT * FROM market_conditions 
+    WHERE date_recorded >= date('now', ?)
+    """
+
+# Seconds a location's forecast is served from memory before re-reading the table
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+# (location, date_range) pairs kept; locations come from user input
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "256"))
+
+# Upcoming forecast days are excluded so the first row is today's
+WEATHER_QUERY = """
+    SELECT * FROM weather_forecast 
+    WHERE location = ? AND date >= date('now', ?) AND date <= date('now')
+    ORDER BY date DESC
+    """
+
+def fetch_farming_conditions(crop_type=None, location=None, date_range=30):
+    query = FARMING_CONDITIONS_QUERY
     params = [f'-{date_range} days']
     
     if crop_type:
         query += " AND crop_type = ?"
         params.append(crop_type)
     
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    return query_df(query, params)
 
 def fetch_market_conditions(product=None, date_range=30):
-    conn = sqlite3.connect(DB_PATH)
-    query = """
-    SELECT * FROM market_conditions 
-    WHERE date_recorded >= date('now', ?)
-    """
+    query = MARKET_CONDITIONS_QUERY
     params = [f'-{date_range} days']
     
     if product:
         query += " AND product = ?"
         params.append(product)
     
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    return query_df(query, params)
+
+_weather_cache = OrderedDict()  # (location, date_range) -> (loaded_at, DataFrame), LRU order
+_weather_cache_lock = threading.Lock()
 
 def fetch_weather_data(location, date_range=7):
-    conn = sqlite3.connect(DB_PATH)
-    query = """
-    SELECT * FROM weather_forecast 
-    WHERE location = ? AND date >= date('now', ?)
-    ORDER BY date DESC
+    """Weather rows for a location up to today, newest first, cached per location.
+
+    Only reads weather_forecast; the upstream API is polled by
+    scraper.weather_scraper.ingest_weather. Treat the result as read-only.
     """
-    df = pd.read_sql_query(query, conn, params=[location, f'-{date_range} days'])
-    conn.close()
-    return df
+    key = (location, date_range)
+    with _weather_cache_lock:
+        entry = _weather_cache.get(key)
+        if entry:
+            _weather_cache.move_to_end(key)
+    if entry and time.monotonic() - entry[0] < WEATHER_CACHE_TTL:
+        return entry[1]
+    weather_df = query_df(WEATHER_QUERY, [location, f'-{date_range} days'])
+    with _weather_cache_lock:
+        _weather_cache[key] = (time.monotonic(), weather_df)
+        _weather_cache.move_to_end(key)
+        while len(_weather_cache) > WEATHER_CACHE_MAX_ENTRIES:
+            _weather_cache.popitem(last=False)
+    return weather_df
 
-def get_sustainability_metrics(crop_type, location):
-    conn = sqlite3.connect(DB_PATH)
-    
-    # Get farming conditions
-    farming_df = fetch_farming_conditions(crop_type, location)
-    
-    # Get market conditions
-    market_df = fetch_market_conditions(crop_type)
+def invalidate_weather_cache(locations=None):
+    """Drop cached forecasts for the given locations (all of them by default)"""
+    with _weather_cache_lock:
+        if locations is None:
+            _weather_cache.clear()
+            return
+        locations = set(locations)
+        for key in [key for key in _weather_cache if key[0] in locations]:
+            del _weather_cache[key]
+
+def get_sustainability_metrics(crop_type, location, date_range=30):
+    # Averages come from the per-day aggregates instead of the raw rows
+    farming = fetch_daily_means('farming_conditions', crop_type, date_range)
+    market = fetch_daily_means('market_conditions', crop_type, date_range)
     
     # Get weather data
     weather_df = fetch_weather_data(location)
     
-    conn.close()
-    
     # Calculate average metrics
     metrics = {
-        'sustainability_score': farming_df['sustainability_score'].mean() if not farming_df.empty else None,
-        'fertilizer_usage': farming_df['fertilizer_usage'].mean() if not farming_df.empty else None,
-        'pesticide_usage': farming_df['pesticide_usage'].mean() if not farming_df.empty else None,
-        'crop_yield': farming_df['crop_yield'].mean() if not farming_df.empty else None,
-        'market_demand': market_df['demand_index'].mean() if not market_df.empty else None,
-        'weather_impact': market_df['weather_impact_score'].mean() if not market_df.empty else None,
+        'sustainability_score': farming['sustainability_score'],
+        'fertilizer_usage': farming['fertilizer_usage'],
+        'pesticide_usage': farming['pesticide_usage'],
+        'crop_yield': farming['crop_yield'],
+        'market_demand': market['demand_index'],
+        'weather_impact': market['weather_impact_score'],
         'current_temperature': weather_df['temperature'].iloc[0] if not weather_df.empty else None
     }
     
@@ -0,0 +1,112 @@
+# backend/database/repository.py
+
+from typing import List
+from database.connection import DB_PATH, execute, executemany, query_all, transaction
+
+RESEARCH_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS research_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        source TEXT NOT NULL,
+        content TEXT NOT NULL,
+        date_collected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(topic, source, content)
+    )
+'''
+
+RESEARCH_QUERY = '''
+    SELECT topic, source, content, date_collected,
+           date_collected > datetime('now', ?) AS fresh
+    FROM research_data 
+    WHERE topic = ?
+    ORDER BY date_collected DESC
+'''
+
+# Re-scraping identical content marks the existing row as freshly collected
+INSERT_RESEARCH_SQL = '''
+    INSERT INTO research_data (topic, source, content)
+    VALUES (?, ?, ?)
+    ON CONFLICT (topic, source, content) DO UPDATE SET date_collected = CURRENT_TIMESTAMP
+    RETURNING id
+'''
+
+RESEARCH_BY_ID_QUERY = '''
+    SELECT id, topic, source, content, date_collected FROM research_data WHERE id IN ({placeholders})
+'''
+
+RESEARCH_AFTER_ID_QUERY = '''
+    SELECT id, content FROM research_data WHERE id > ? ORDER BY id
+'''
+
+TOPICS_DUE_QUERY = '''
+    SELECT topic FROM research_data
+    GROUP BY topic
+    HAVING MAX(date_collected) <= datetime('now', ?)
+'''
+
+# Relies on the unique (location, date) index from migration 3
+UPSERT_WEATHER_SQL = '''
+    INSERT INTO weather_forecast (location, date, temperature, humidity, rainfall, wind_speed, conditions)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (location, date) DO UPDATE SET
+        temperature = excluded.temperature,
+        humidity = excluded.humidity,
+        rainfall = excluded.rainfall,
+        wind_speed = excluded.wind_speed,
+        conditions = excluded.conditions
+'''
+
+# Prices are per ton, like the dataset's Market_Price_per_ton; the modal
+# price goes in market_price.
+# Relies on the unique (product, market, date_recorded) index from migration 4
+UPSERT_MARKET_PRICE_SQL = '''
+    INSERT INTO market_conditions (product, market, min_price, max_price, market_price, date_recorded)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (product, market, date_recorded) DO UPDATE SET
+        min_price = excluded.min_price,
+        max_price = excluded.max_price,
+        market_price = excluded.market_price
+'''
+
+WEATHER_LOCATIONS_QUERY = "SELECT DISTINCT location FROM weather_forecast"
+
+def init_research_table(db_path: str = DB_PATH):
+    """Create the research_data table if it does not exist"""
+    execute(RESEARCH_TABLE_SQL, db_path=db_path)
+
+def get_research(topic: str, max_age_days: int = 7, db_path: str = DB_PATH) -> List[tuple]:
+    """All research rows for a topic, newest first, flagged fresh if younger than max_age_days"""
+    return query_all(RESEARCH_QUERY, (f'-{max_age_days} days', topic), db_path=db_path)
+
+def store_research(topic: str, source: str, content: str, db_path: str = DB_PATH) -> int:
+    """Insert a research row, or refresh the collection time of an identical one; returns its id"""
+    with transaction(db_path) as conn:
+        return conn.execute(INSERT_RESEARCH_SQL, (topic, source, content)).fetchone()[0]
+
+def get_research_by_ids(ids: List[int], db_path: str = DB_PATH) -> List[tuple]:
+    """(id, topic, source, content, date_collected) rows for the given ids, in no particular order"""
+    if not ids:
+        return []
+    query = RESEARCH_BY_ID_QUERY.format(placeholders=', '.join('?' for _ in ids))
+    return query_all(query, list(ids), db_path=db_path)
+
+def get_research_after(last_id: int, db_path: str = DB_PATH) -> List[tuple]:
+    """(id, content) of every research row with an id above last_id"""
+    return query_all(RESEARCH_AFTER_ID_QUERY, (last_id,), db_path=db_path)
+
+def get_topics_due(older_than_hours: float, db_path: str = DB_PATH) -> List[str]:
+    """Topics whose newest research row is at least older_than_hours old"""
+    rows = query_all(TOPICS_DUE_QUERY, (f'-{older_than_hours} hours',), db_path=db_path)
+    return [row[0] for row in rows]
+
+def store_weather_forecasts(rows: List[tuple], db_path: str = DB_PATH):
+    """Bulk upsert (location, date, temperature, humidity, rainfall, wind_speed, conditions) rows"""
+    executemany(UPSERT_WEATHER_SQL, rows, db_path=db_path)
+
+def get_weather_locations(db_path: str = DB_PATH) -> List[str]:
+    """Every location weather_forecast holds forecasts for"""
+    return [row[0] for row in query_all(WEATHER_LOCATIONS_QUERY, db_path=db_path)]
+
+def store_market_prices(rows: List[tuple], db_path: str = DB_PATH):
+    """Bulk upsert (product, market, min_price, max_price, modal_price, date) rows, prices per ton"""
+    executemany(UPSERT_MARKET_PRICE_SQL, rows, db_path=db_path)
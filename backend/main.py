@@ -1,10 +1,56 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
+from fastapi.responses import FileResponse, JSONResponse
+
+# The backend packages import each other as top-level modules (agents, database, ...),
+# so make them importable when started from the repo root as backend.main
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+# Relative paths would otherwise depend on where uvicorn was started
+os.environ.setdefault("DB_PATH", os.path.join(BACKEND_DIR, "farming_data.db"))
+
+from agents.farmer_advisor import FarmerAdvisor
+from agents.market_researcher import MarketResearcher
+from database.connection import close_all
+from database.migrations import apply_migrations
+from agents.voice_query_agent import use_agents
+from routers import advice, market, metrics, sustainability, voice
+from routers.common import API_MAX_WORKERS
+from utils.llm_scheduler import Overloaded
+
+FRONTEND_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "frontend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix="api")
+    app.state.executor = executor
 
-app = FastAPI()
+    # Bring the database schema up to date before serving
+    try:
+        await loop.run_in_executor(executor, apply_migrations)
+    except Exception as e:
+        print(f"Error applying database migrations: {e}")
+
+    # One set of agents per worker, shared by every request
+    app.state.farmer_advisor = await loop.run_in_executor(executor, FarmerAdvisor)
+    app.state.market_researcher = await loop.run_in_executor(executor, MarketResearcher)
+    use_agents(farmer_advisor=app.state.farmer_advisor, market_researcher=app.state.market_researcher)
+    try:
+        yield
+    finally:
+        app.state.farmer_advisor.research_agent.refresher.stop()
+        executor.shutdown(wait=False)
+        close_all()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -15,18 +61,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+# Same endpoints as the Flask app in app.py
+app.include_router(advice.router)
+app.include_router(market.router)
+app.include_router(sustainability.router)
+app.include_router(voice.router)
+app.include_router(metrics.router)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+if os.path.isdir(FRONTEND_DIR):
+    app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
 @app.get("/")
 async def read_root():
-    return FileResponse('frontend/index.html')
-
-# Import and include routers
-from agents.farmer_advisor import router as farmer_router
-from agents.market_researcher import router as market_router
-from agents.weather_agent import router as weather_router
-
-app.include_router(farmer_router, prefix="/api/farmer", tags=["farmer"])
-app.include_router(market_router, prefix="/api/market", tags=["market"])
-app.include_router(weather_router, prefix="/api/weather", tags=["weather"]) 
\ No newline at end of file
+    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
@@ -0,0 +1,66 @@
+### routers/advice.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from routers.common import admit_llm_work, iterate_blocking, ndjson, run_blocking
+from utils.llm_scheduler import Overloaded
+from utils.query_parsing import AdviceQuery, QueryError
+
+router = APIRouter(tags=["advice"], dependencies=[Depends(admit_llm_work)])
+
+
+class AdviceRequest(BaseModel):
+    # Either the legacy "key: value, ..." string or the fields themselves
+    input: Optional[str] = None
+    location: Optional[str] = None
+    crop: Optional[str] = None
+    soil_type: Optional[str] = None
+    season: Optional[str] = None
+    water_availability: Optional[str] = None
+    previous_crop: Optional[str] = None
+    pest_issues: Optional[str] = None
+    # "sections" (default) or "single_pass"
+    mode: Optional[str] = None
+
+
+@router.post("/query")
+async def query_handler(body: AdviceRequest, request: Request):
+    try:
+        query = AdviceQuery.from_payload(body.model_dump(exclude_none=True))
+    except QueryError as e:
+        return {"error": str(e)}
+
+    try:
+        result = await run_blocking(
+            request, request.app.state.farmer_advisor.get_farm_advice,
+            **query.as_kwargs(), mode=body.mode
+        )
+    except Overloaded:
+        raise
+    except Exception as e:
+        print("Error in query_handler:", str(e))
+        return {"error": str(e)}
+
+    if "error" in result:
+        return {"error": result["error"]}
+
+    return {
+        "advice": result.get("advice", ""),
+        "metrics": result.get("metrics", {}),
+        "research_sources": result.get("research_sources", []),
+        "unavailable_sections": result.get("unavailable_sections", {}),
+        "semantic_cache": result.get("semantic_cache", {"hit": False, "similarity": None}),
+        "mode": result.get("mode")
+    }
+
+
+@router.post("/query/stream")
+async def query_stream_handler(body: AdviceRequest, request: Request):
+    try:
+        query = AdviceQuery.from_payload(body.model_dump(exclude_none=True))
+    except QueryError as e:
+        return {"error": str(e)}
+
+    events = request.app.state.farmer_advisor.stream_farm_advice(**query.as_kwargs())
+    return StreamingResponse(ndjson(iterate_blocking(request, events)), media_type="application/x-ndjson")
@@ -0,0 +1,49 @@
+### routers/common.py
+import asyncio
+import json
+import os
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable
+from fastapi import Request
+from utils.llm_scheduler import llm_scheduler
+
+# Threads available to blocking DB/LLM work across all in-flight requests of a worker
+API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "16"))
+
+_DONE = object()
+
+
+async def admit_llm_work():
+    """Router dependency: shed the request with a 503 before doing any work if the LLM queue is full"""
+    llm_scheduler.admit()
+
+
+async def run_blocking(request: Request, fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call on the app's bounded executor without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app.state.executor, partial(fn, *args, **kwargs))
+
+
+async def iterate_blocking(request: Request, items: Iterable) -> AsyncIterator:
+    """Consume a blocking iterator (e.g. an agent's event stream) one item at a time on the executor"""
+    iterator = iter(items)
+    try:
+        while True:
+            item = await run_blocking(request, next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        # Client went away: let the agent stop its own workers
+        close = getattr(iterator, 'close', None)
+        if close:
+            try:
+                await run_blocking(request, close)
+            except ValueError:
+                pass  # still running on another thread; it finishes on its own
+
+
+async def ndjson(events: AsyncIterator) -> AsyncIterator[str]:
+    """Serialize agent events as newline-delimited JSON for a streamed response"""
+    async for event in events:
+        yield json.dumps(event, default=str) + "\n"
@@ -0,0 +1,25 @@
+### routers/market.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from routers.common import admit_llm_work, iterate_blocking, ndjson, run_blocking
+
+router = APIRouter(tags=["market"], dependencies=[Depends(admit_llm_work)])
+
+
+class MarketRequest(BaseModel):
+    region: Optional[str] = None
+    crop: Optional[str] = None
+
+
+@router.post("/market")
+async def market_handler(body: MarketRequest, request: Request):
+    market_researcher = request.app.state.market_researcher
+    return {"market_info": await run_blocking(request, market_researcher.get_market_trends, body.region, body.crop)}
+
+
+@router.post("/market/stream")
+async def market_stream_handler(body: MarketRequest, request: Request):
+    events = request.app.state.market_researcher.stream_market_trends(body.region, body.crop)
+    return StreamingResponse(ndjson(iterate_blocking(request, events)), media_type="application/x-ndjson")
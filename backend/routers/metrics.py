@@ -0,0 +1,22 @@
+### routers/metrics.py
+from fastapi import APIRouter, Request
+from agents.voice_query_agent import router_stats
+from utils.embeddings import embedding_cache
+from utils.llm import prefill_stats, response_cache
+from utils.llm_scheduler import llm_scheduler
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def metrics_handler(request: Request):
+    semantic_cache = request.app.state.farmer_advisor.semantic_cache
+    return {
+        "llm_cache": response_cache.stats(),
+        "advice_coalescing": request.app.state.farmer_advisor.inflight.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_prefill": prefill_stats.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "intent_router": router_stats()
+    }
@@ -0,0 +1,18 @@
+### routers/sustainability.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
+from agents.sustainability_metrics import evaluate_sustainability
+from routers.common import admit_llm_work, run_blocking
+
+router = APIRouter(tags=["sustainability"], dependencies=[Depends(admit_llm_work)])
+
+
+class SustainabilityRequest(BaseModel):
+    crop: Optional[str] = None
+    soil: Optional[str] = None
+
+
+@router.post("/sustainability")
+async def sustainability_handler(body: SustainabilityRequest, request: Request):
+    return {"sustainability": await run_blocking(request, evaluate_sustainability, body.crop, body.soil)}
@@ -0,0 +1,18 @@
+### routers/voice.py
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
+from agents.voice_query_agent import handle_voice_query
+from routers.common import admit_llm_work, run_blocking
+
+router = APIRouter(tags=["voice"], dependencies=[Depends(admit_llm_work)])
+
+
+class VoiceQueryRequest(BaseModel):
+    input: str
+
+
+@router.post("/voice_query")
+async def voice_query_handler(body: VoiceQueryRequest, request: Request):
+    if not body.input.strip():
+        return {"error": "Missing input parameter"}
+    return await run_blocking(request, handle_voice_query, body.input)
@@ -0,0 +1,215 @@
+### scraper/crawler.py
+import asyncio
+import os
+import threading
+import time
+import urllib.robotparser
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from scraper.http_cache import CachedEntry, HttpCache
+
+CRAWLER_CONCURRENCY = int(os.getenv("CRAWLER_CONCURRENCY", "8"))
+CRAWLER_PER_HOST_CONCURRENCY = int(os.getenv("CRAWLER_PER_HOST_CONCURRENCY", "2"))
+# Politeness: sustained requests per second to any one host, and the burst allowed
+CRAWLER_HOST_RATE = float(os.getenv("CRAWLER_HOST_RATE", "0.5"))
+CRAWLER_HOST_BURST = int(os.getenv("CRAWLER_HOST_BURST", "1"))
+CRAWLER_TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "15"))
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", str(24 * 60 * 60)))
+
+
+class TokenBucket:
+    """Per-host rate limiter; shared by every crawl so politeness holds across requests"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class RobotsCache:
+    """robots.txt rules per origin, fetched once and reused until they expire"""
+
+    def __init__(self, user_agent: str, ttl: float = ROBOTS_TTL):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self._entries = {}  # origin -> (fetched_at, parser or None for "allow all")
+        self._pending = {}  # origin -> in-flight fetch, so each origin is fetched once
+        self._lock = threading.Lock()
+
+    async def _fetch(self, client: httpx.AsyncClient, origin: str):
+        parser = urllib.robotparser.RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = await client.get(f"{origin}/robots.txt")
+        except httpx.HTTPError as e:
+            print(f"Error fetching robots.txt for {origin}: {e}")
+            # Unreachable: stay away for now, but retry on the next crawl
+            parser.disallow_all = True
+            return parser, False
+        if response.status_code >= 500:
+            parser.disallow_all = True
+            return parser, False
+        if response.status_code >= 400:
+            return None, True  # no robots.txt means everything is allowed
+        parser.parse(response.text.splitlines())
+        return parser, True
+
+    async def parser_for(self, client: httpx.AsyncClient, url: str):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            entry = self._entries.get(origin)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        if origin not in self._pending:
+            self._pending[origin] = asyncio.ensure_future(self._fetch(client, origin))
+        try:
+            parser, cacheable = await asyncio.shield(self._pending[origin])
+        finally:
+            self._pending.pop(origin, None)
+        if cacheable:
+            with self._lock:
+                self._entries[origin] = (time.monotonic(), parser)
+        return parser
+
+    async def allowed(self, client: httpx.AsyncClient, url: str) -> bool:
+        parser = await self.parser_for(client, url)
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, client: httpx.AsyncClient, url: str) -> Optional[float]:
+        parser = await self.parser_for(client, url)
+        return parser.crawl_delay(self.user_agent) if parser else None
+
+
+class AsyncCrawler:
+    """Polite concurrent fetcher.
+
+    All crawls run on one background event loop with one pooled HTTP client,
+    so the global and per-host concurrency caps, the per-host token buckets
+    and kept-alive connections are shared by every caller in the process.
+    With an http_cache, fresh responses are served from disk without touching
+    the network and stale ones are revalidated with a conditional GET.
+    Pass an httpx transport (e.g. httpx.MockTransport) to test without the network.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        concurrency: int = CRAWLER_CONCURRENCY,
+        per_host_concurrency: int = CRAWLER_PER_HOST_CONCURRENCY,
+        host_rate: float = CRAWLER_HOST_RATE,
+        host_burst: int = CRAWLER_HOST_BURST,
+        timeout: float = CRAWLER_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        http_cache: Optional[HttpCache] = None
+    ):
+        self.headers = headers
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.timeout = timeout
+        self.transport = transport
+        self.http_cache = http_cache
+        self.robots = RobotsCache(headers.get('User-Agent', '*'))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="crawler", daemon=True).start()
+            return self._loop
+
+    def _bucket(self, host: str, crawl_delay: Optional[float]) -> TokenBucket:
+        if host not in self._buckets:
+            rate = self.host_rate
+            if crawl_delay:
+                # Honour a stricter Crawl-delay from robots.txt
+                rate = min(rate, 1 / crawl_delay)
+            self._buckets[host] = TokenBucket(rate, self.host_burst)
+        return self._buckets[host]
+
+    def _from_entry(self, url: str, entry: CachedEntry) -> httpx.Response:
+        return httpx.Response(
+            entry.status,
+            headers=entry.headers,
+            content=entry.body,
+            request=httpx.Request('GET', url)
+        )
+
+    async def _fetch(self, url: str) -> Optional[httpx.Response]:
+        entry = self.http_cache.lookup(url) if self.http_cache else None
+        if entry and self.http_cache.is_fresh(url, entry):
+            return self._from_entry(url, entry)
+
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        async with self._global_limit, self._host_limits[host]:
+            try:
+                if not await self.robots.allowed(self._client, url):
+                    print(f"Skipping {url}: disallowed by robots.txt")
+                    return None
+                bucket = self._bucket(host, await self.robots.crawl_delay(self._client, url))
+                await bucket.acquire()
+                if not self.http_cache:
+                    return await self._client.get(url)
+                headers = self.http_cache.conditional_headers(entry) if entry else None
+                response = await self._client.get(url, headers=headers)
+                if entry and response.status_code == 304:
+                    return self._from_entry(url, self.http_cache.revalidated(url, entry, response.headers))
+                self.http_cache.store(url, response.status_code, response.headers, response.content)
+                return response
+            except httpx.HTTPError as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+
+    async def _fetch_all(self, urls: List[str]) -> Dict[str, Optional[httpx.Response]]:
+        # Created on the crawler loop so they are bound to it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.concurrency)
+            )
+            self._global_limit = asyncio.Semaphore(self.concurrency)
+        responses = await asyncio.gather(*(self._fetch(url) for url in urls))
+        return dict(zip(urls, responses))
+
+    def fetch_all(self, urls: List[str]) -> Dict[str, Optional[httpx.Response]]:
+        """Fetch urls concurrently from any thread; failed or disallowed urls map to None"""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls), self._ensure_loop())
+        return future.result()
+
+    async def afetch_all(self, urls: List[str]) -> Dict[str, Optional[httpx.Response]]:
+        """Awaitable fetch_all for callers already running an event loop"""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls), self._ensure_loop())
+        return await asyncio.wrap_future(future)
@@ -0,0 +1,208 @@
+### scraper/http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Seconds a stored response is served without asking the upstream again, by
+# host. After that it is revalidated with If-None-Match / If-Modified-Since.
+FRESHNESS_POLICIES = {
+    'agmarknet.gov.in': 6 * 60 * 60,     # mandi prices are published a few times a day
+    'api.weatherapi.com': 30 * 60,       # forecasts update roughly hourly
+    'default': 24 * 60 * 60,             # extension sites and everything else
+}
+
+# Headers worth keeping with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class CachedEntry:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, stored_at: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+
+
+class HttpCache:
+    """On-disk response cache shared by the scrapers.
+
+    Bodies are stored zlib-compressed next to a small JSON metadata file.
+    Total size is bounded; the least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        directory: str = HTTP_CACHE_DIR,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+        policies: Optional[Dict[str, float]] = None
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.policies = policies or FRESHNESS_POLICIES
+        self._index: Dict[str, list] = {}  # key -> [size_bytes, last_used]
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.z'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                self._index[name[:-2]] = [stat.st_size, stat.st_mtime]
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.z'
+
+    def max_age(self, url: str) -> float:
+        host = urlsplit(url).hostname or ''
+        for domain, seconds in self.policies.items():
+            if host == domain or host.endswith('.' + domain):
+                return seconds
+        return self.policies['default']
+
+    def lookup(self, url: str) -> Optional[CachedEntry]:
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (OSError, ValueError, zlib.error):
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = time.time()
+        return CachedEntry(meta['status'], meta['headers'], body, meta['stored_at'])
+
+    def is_fresh(self, url: str, entry: CachedEntry) -> bool:
+        return time.time() - entry.stored_at < self.max_age(url)
+
+    def conditional_headers(self, entry: CachedEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.headers.get('ETag'):
+            headers['If-None-Match'] = entry.headers['ETag']
+        if entry.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        return headers
+
+    def store(self, url: str, status: int, headers, body: bytes) -> Optional[CachedEntry]:
+        """Store a 200 response unless the upstream forbids it"""
+        if status != 200 or 'no-store' in (headers.get('Cache-Control') or ''):
+            return None
+        kept = {name: headers[name] for name in STORED_HEADERS if headers.get(name)}
+        entry = CachedEntry(status, kept, body, time.time())
+        self._write(self._key(url), entry)
+        return entry
+
+    def revalidated(self, url: str, entry: CachedEntry, headers) -> CachedEntry:
+        """Record a 304: the stored body is good for another freshness period"""
+        for name in ('ETag', 'Last-Modified'):
+            if headers.get(name):
+                entry.headers[name] = headers[name]
+        entry.stored_at = time.time()
+        self._write(self._key(url), entry, body_unchanged=True)
+        return entry
+
+    def _write(self, key: str, entry: CachedEntry, body_unchanged: bool = False):
+        meta_path, body_path = self._paths(key)
+        meta = {'status': entry.status, 'headers': entry.headers, 'stored_at': entry.stored_at}
+        try:
+            if not body_unchanged:
+                compressed = zlib.compress(entry.body, 6)
+                self._atomic_write(body_path, compressed)
+                with self._lock:
+                    self._index[key] = [len(compressed), time.time()]
+            self._atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            print(f"HTTP cache write failed: {e}")
+            return
+        self._evict()
+
+    def _atomic_write(self, path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        with self._lock:
+            total = sum(size for size, _ in self._index.values())
+            if total <= self.max_bytes:
+                return
+            victims = []
+            # Drop least recently used entries until we are 10% under the limit
+            for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes * 0.9:
+                    break
+                victims.append(key)
+                total -= size
+            for key in victims:
+                del self._index[key]
+        for key in victims:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class CachedSession:
+    """Pooled requests.Session whose GETs go through an HttpCache"""
+
+    def __init__(self, cache: HttpCache, headers: Optional[Dict[str, str]] = None, pool_size: int = 10):
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def _from_entry(self, url: str, entry: CachedEntry) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response._content = entry.body
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+    def get(self, url: str, params=None, **kwargs) -> requests.Response:
+        # Key on the final URL, query string included
+        url = requests.Request('GET', url, params=params).prepare().url
+        entry = self.cache.lookup(url)
+        if entry and self.cache.is_fresh(url, entry):
+            return self._from_entry(url, entry)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            headers.update(self.cache.conditional_headers(entry))
+        response = self.session.get(url, headers=headers, **kwargs)
+
+        if entry and response.status_code == 304:
+            return self._from_entry(url, self.cache.revalidated(url, entry, response.headers))
+        self.cache.store(url, response.status_code, response.headers, response.content)
+        response.from_cache = False
+        return response
+
+
+# Shared by every scraper in the process
+default_cache = HttpCache()
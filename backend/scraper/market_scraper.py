@@ -1,17 +1,144 @@
-
 ### scraper/market_scraper.py
-import requests
-from bs4 import BeautifulSoup
+from datetime import datetime
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+from lxml import etree
+from database.connection import DB_PATH
+from database.repository import store_market_prices
+from scraper.http_cache import CachedSession, default_cache
+
+session = CachedSession(default_cache)
+
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Agmarknet header text (lower-cased, units stripped) -> MarketPrice field
+PRICE_COLUMNS = {
+    'commodity': 'commodity',
+    'market name': 'market',
+    'min price': 'min_price',
+    'max price': 'max_price',
+    'modal price': 'modal_price',
+    'price date': 'date',
+}
+
+# Agmarknet quotes Rs/quintal; market_conditions holds prices per ton
+QUINTALS_PER_TON = 10
+
+DATE_FORMATS = ('%d %b %Y', '%d-%b-%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d')
+
+
+class MarketPrice(NamedTuple):
+    commodity: str
+    market: str
+    min_price: Optional[float]
+    max_price: Optional[float]
+    modal_price: Optional[float]
+    date: Optional[str]  # ISO date
+
+
+def _price(text: str) -> Optional[float]:
+    try:
+        return float(text.replace(',', ''))
+    except ValueError:
+        return None
+
+def _date(text: str) -> Optional[str]:
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def _header_columns(cells: List[str]) -> Optional[dict]:
+    """Map cell positions to fields if this row is a price table header"""
+    columns = {}
+    for position, cell in enumerate(cells):
+        name = cell.lower().split('(')[0].strip()
+        if name in PRICE_COLUMNS:
+            columns[position] = PRICE_COLUMNS[name]
+    return columns if 'modal_price' in columns.values() else None
+
+def _typed_row(columns: dict, cells: List[str]) -> Optional[MarketPrice]:
+    values = {field: cells[position] for position, field in columns.items() if position < len(cells)}
+    if not values.get('commodity') or not values.get('market'):
+        return None
+    return MarketPrice(
+        commodity=values['commodity'],
+        market=values['market'],
+        min_price=_price(values.get('min_price', '')),
+        max_price=_price(values.get('max_price', '')),
+        modal_price=_price(values.get('modal_price', '')),
+        date=_date(values.get('date', '')),
+    )
+
+def iter_price_rows(chunks: Iterable[bytes]) -> Iterator[MarketPrice]:
+    """Stream typed rows out of every price table in an HTML document.
+
+    The document is fed to lxml incrementally. Rows are emitted as each </tr>
+    closes and every finished element is discarded, so memory stays bounded
+    by one table row and work outside the price tables is just tokenizing.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    columns = None
+    open_rows = 0
+
+    def drain():
+        nonlocal columns, open_rows
+        for event, element in parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ''
+            if event == 'start':
+                if tag == 'tr':
+                    open_rows += 1
+                continue
+            if tag == 'tr':
+                open_rows -= 1
+                cells = [
+                    ' '.join(''.join(cell.itertext()).split())
+                    for cell in element if cell.tag in ('td', 'th')
+                ]
+                if columns is None:
+                    columns = _header_columns(cells)
+                else:
+                    row = _typed_row(columns, cells)
+                    if row:
+                        yield row
+            elif tag == 'table':
+                columns = None
+            elif open_rows:
+                continue  # cell content is read when its row closes
+            element.clear()
+            # Drop already-processed siblings so the tree never grows
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+def _per_ton(price: Optional[float]) -> Optional[float]:
+    return None if price is None else price * QUINTALS_PER_TON
+
+def _chunks(content: bytes, size: int = PARSE_CHUNK_SIZE) -> Iterator[bytes]:
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
 
-def get_market_data(crop_name, region):
+def get_market_data(crop_name, region, db_path=DB_PATH):
     try:
         # Example scraping logic from Agmarknet
-        url = f"https://agmarknet.gov.in/SearchCmmMkt.aspx?Tx_Commodity={crop_name}&Tx_State={region}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
-        tables = soup.find_all("table")
-        if tables:
-            return {"scraped": soup.get_text()[:500]}  # simplify for demo
-        return {"error": "No table found"}
-    except:
+        url = "https://agmarknet.gov.in/SearchCmmMkt.aspx"
+        response = session.get(url, params={"Tx_Commodity": crop_name, "Tx_State": region}, timeout=30)
+        rows = list(iter_price_rows(_chunks(response.content)))
+        if not rows:
+            return {"error": "No price table found"}
+        store_market_prices(
+            [(r.commodity, r.market, _per_ton(r.min_price), _per_ton(r.max_price), _per_ton(r.modal_price), r.date)
+             for r in rows if r.date],
+            db_path=db_path
+        )
+        # The response keeps Agmarknet's own per-quintal figures
+        return {"prices": [r._asdict() for r in rows]}
+    except Exception as e:
+        print(f"Error scraping market data for {crop_name} in {region}: {e}")
         return {"error": "Failed to fetch market data"}
@@ -1,11 +1,73 @@
 ### scraper/weather_scraper.py
-import requests
-import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from database.connection import DB_PATH
+from database.query_interface import invalidate_weather_cache
+from database.repository import get_weather_locations, store_weather_forecasts
+from scraper.http_cache import CachedSession, default_cache
+
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "YOUR_API_KEY")
+WEATHER_FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", "3"))
+WEATHER_FETCH_WORKERS = int(os.getenv("WEATHER_FETCH_WORKERS", "8"))
+
+session = CachedSession(default_cache, pool_size=WEATHER_FETCH_WORKERS)
 
 def get_weather_data(location):
-    url = f"https://api.weatherapi.com/v1/forecast.json?key=YOUR_API_KEY&q={location}&days=3"
-    response = requests.get(url)
+    url = "https://api.weatherapi.com/v1/forecast.json"
+    params = {"key": WEATHER_API_KEY, "q": location, "days": WEATHER_FORECAST_DAYS}
+    response = session.get(url, params=params, timeout=30)
     if response.status_code == 200:
         return response.json()
     else:
         return {"error": "Weather API failed"}
+
+def parse_forecast(location: str, data: Dict) -> List[tuple]:
+    """weatherapi.com forecast JSON -> weather_forecast rows"""
+    rows = []
+    for forecast_day in data.get('forecast', {}).get('forecastday', []):
+        day = forecast_day.get('day', {})
+        rows.append((
+            location,
+            forecast_day['date'],
+            day.get('avgtemp_c'),
+            day.get('avghumidity'),
+            day.get('totalprecip_mm'),
+            day.get('maxwind_kph'),
+            day.get('condition', {}).get('text'),
+        ))
+    return rows
+
+def _fetch_rows(location: str) -> List[tuple]:
+    try:
+        data = get_weather_data(location)
+    except Exception as e:
+        print(f"Error fetching weather for {location}: {e}")
+        return []
+    if 'error' in data:
+        print(f"Error fetching weather for {location}: {data['error']}")
+        return []
+    return parse_forecast(location, data)
+
+def ingest_weather(locations: Optional[Iterable[str]] = None, db_path: str = DB_PATH) -> int:
+    """Fetch forecasts for many locations concurrently and upsert them in one batch.
+
+    Defaults to every location already in weather_forecast. Returns the number
+    of rows written. Advice requests only ever read the table.
+    """
+    locations = list(locations or get_weather_locations(db_path))
+    if not locations:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(WEATHER_FETCH_WORKERS, len(locations))) as executor:
+        results = dict(zip(locations, executor.map(_fetch_rows, locations)))
+    rows = [row for location_rows in results.values() for row in location_rows]
+    if rows:
+        store_weather_forecasts(rows, db_path=db_path)
+        invalidate_weather_cache([location for location, location_rows in results.items() if location_rows])
+    return len(rows)
+
+if __name__ == "__main__":
+    # Run from backend/ (e.g. from cron) as: python -m scraper.weather_scraper [location ...]
+    written = ingest_weather(sys.argv[1:] or None)
+    print(f"Stored {written} forecast rows")
@@ -0,0 +1,101 @@
+"""Compare the three-call and single-pass advice modes against a live Ollama.
+
+Run from backend/:
+
+    python -m scripts.benchmark_advice --runs 5 --ollama-pid $(pgrep -f "ollama serve")
+
+The response and semantic caches are bypassed so every run pays for
+generation. Client CPU is this process (prompt building, JSON parsing,
+thread pool); server CPU is read from /proc when --ollama-pid is given,
+since inference happens in the Ollama process.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("LLM_CACHE_PERSIST", "0")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+os.environ.setdefault("RESEARCH_BACKGROUND_REFRESH", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.farmer_advisor import ADVICE_MODES, FarmerAdvisor
+from database.migrations import apply_migrations
+from utils.llm import prefill_stats, response_cache
+
+
+def _prefill_totals():
+    """Ollama's own counts and timings, summed over every model so far"""
+    totals = dict.fromkeys(('calls', 'prompt_tokens', 'prompt_eval_seconds', 'eval_tokens', 'eval_seconds'), 0)
+    for model in prefill_stats.stats().values():
+        for name in totals:
+            totals[name] += model[name]
+    return totals
+
+
+def _process_cpu(pid):
+    """User + system CPU seconds of another process (Linux only)"""
+    if pid is None:
+        return None
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def run_mode(advisor, mode, query, runs, ollama_pid=None):
+    rows = []
+    for _ in range(runs):
+        response_cache.clear()
+        before = _prefill_totals()
+        server_cpu = _process_cpu(ollama_pid)
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = advisor.get_farm_advice(**query, mode=mode)
+        row = {
+            'latency': time.perf_counter() - wall,
+            'client_cpu': time.process_time() - cpu,
+            **{name: value - before[name] for name, value in _prefill_totals().items()},
+            'failed_sections': len(result.get('unavailable_sections') or {}) if 'error' not in result else 3,
+        }
+        if server_cpu is not None:
+            row['server_cpu'] = _process_cpu(ollama_pid) - server_cpu
+        rows.append(row)
+    return rows
+
+
+def summarize(mode, rows):
+    print(f"\n{mode} ({len(rows)} runs)")
+    for name in rows[0]:
+        values = [row[name] for row in rows]
+        print(f"  {name:<20} median {statistics.median(values):>10.3f}   max {max(values):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--location', default='Haryana')
+    parser.add_argument('--crop', default='Potato')
+    parser.add_argument('--soil-type', default='Sandy')
+    parser.add_argument('--water-availability', default='High')
+    parser.add_argument('--pest-issues', default='aphids')
+    parser.add_argument('--ollama-pid', type=int)
+    parser.add_argument('--sequential', action='store_true', help="run sections one after another")
+    args = parser.parse_args()
+
+    query = {
+        'location': args.location,
+        'crop': args.crop,
+        'soil_type': args.soil_type,
+        'water_availability': args.water_availability,
+        'pest_issues': args.pest_issues,
+    }
+    apply_migrations()
+    advisor = FarmerAdvisor(concurrent=not args.sequential)
+    for mode in ADVICE_MODES:
+        # One unmeasured call loads the mode's models
+        run_mode(advisor, mode, query, 1)
+        summarize(mode, run_mode(advisor, mode, query, args.runs, args.ollama_pid))
+
+
+if __name__ == "__main__":
+    main()
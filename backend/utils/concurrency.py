@@ -0,0 +1,160 @@
+### utils/concurrency.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+from utils.llm_scheduler import Overloaded, llm_scheduler
+
+# Threads for model calls across all requests: by default one per section
+# (three) of every request the API serves at once (API_MAX_WORKERS). How many
+# actually reach Ollama is decided per model by utils.llm_scheduler.
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", str(3 * int(os.getenv("API_MAX_WORKERS", "16")))))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+# Free pool threads. Work is only submitted when one is free, so calls never
+# sit in the executor's unbounded queue: the scheduler's bounded, deadline-
+# limited queue is the only place they wait.
+_capacity = threading.BoundedSemaphore(LLM_MAX_WORKERS)
+
+
+def _submit(fn: Callable, *args) -> Future:
+    """Start fn on a free pool thread or raise Overloaded"""
+    if not _capacity.acquire(blocking=False):
+        raise llm_scheduler.reject(f"All {LLM_MAX_WORKERS} model-call workers are busy")
+
+    def run():
+        try:
+            return fn(*args)
+        finally:
+            _capacity.release()
+
+    try:
+        return _executor.submit(run)
+    except BaseException:
+        _capacity.release()
+        raise
+
+
+def _raise_if_overloaded(results: Dict[str, Any], failures: Dict[str, str], shed: list, timeout: float = None):
+    """Nothing finished because work was turned away or every call ran out of
+    time: that is an overload (served as 503), not a partial answer"""
+    if results or not failures:
+        return
+    if shed:
+        raise shed[0]
+    if timeout is not None and all(reason == 'timeout' for reason in failures.values()):
+        raise Overloaded(f"No model call finished within {timeout:g}s")
+
+
+def run_concurrently(
+    tasks: Dict[str, Callable[[], Any]],
+    timeout: float
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run named tasks on the shared pool and collect whatever finishes within the timeout.
+
+    Returns (results, failures) where failures maps a task name to 'timeout'
+    or to the error message it raised, so callers can build partial responses.
+    Raises Overloaded if no task finished and any was shed or all timed out.
+    """
+    futures, failures, shed = {}, {}, []
+    for name, fn in tasks.items():
+        try:
+            futures[name] = _submit(fn)
+        except Overloaded as e:
+            shed.append(e)
+            failures[name] = str(e)
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for name, future in futures.items():
+        if future not in done:
+            # Drop it if it never started; a running call finishes in the background
+            future.cancel()
+            failures[name] = "timeout"
+            continue
+        try:
+            results[name] = future.result()
+        except Overloaded as e:
+            shed.append(e)
+            failures[name] = str(e)
+        except Exception as e:
+            print(f"Error in {name}: {e}")
+            failures[name] = str(e)
+
+    _raise_if_overloaded(results, failures, shed, timeout)
+    return results, failures
+
+
+def run_sequentially(tasks: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Serial counterpart of run_concurrently with the same partial-result contract"""
+    results, failures, shed = {}, {}, []
+    for name, fn in tasks.items():
+        try:
+            results[name] = fn()
+        except Overloaded as e:
+            shed.append(e)
+            failures[name] = str(e)
+        except Exception as e:
+            print(f"Error in {name}: {e}")
+            failures[name] = str(e)
+
+    _raise_if_overloaded(results, failures, shed)
+    return results, failures
+
+
+def stream_concurrently(
+    streams: Dict[str, Callable[[], Iterable[str]]],
+    timeout: float
+) -> Iterator[Tuple[str, str, Any]]:
+    """Pump several chunk streams on the shared pool and yield events as they arrive.
+
+    Yields (name, kind, payload) tuples where kind is 'chunk' (payload is the
+    text), 'done', 'error' (payload is the message) or 'timeout'. Every stream
+    ends with exactly one non-chunk event.
+    """
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def pump(name, make_stream):
+        try:
+            chunks = make_stream()
+            for chunk in chunks:
+                if stop.is_set():
+                    # Closing the generator releases the underlying HTTP response
+                    getattr(chunks, 'close', lambda: None)()
+                    return
+                events.put((name, 'chunk', chunk))
+            events.put((name, 'done', None))
+        except Exception as e:
+            print(f"Error in {name}: {e}")
+            events.put((name, 'error', str(e)))
+
+    for name, make_stream in streams.items():
+        try:
+            _submit(pump, name, make_stream)
+        except Overloaded as e:
+            events.put((name, 'error', str(e)))
+
+    deadline = time.monotonic() + timeout
+    pending = set(streams)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                name, kind, payload = events.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if kind != 'chunk':
+                pending.discard(name)
+            yield name, kind, payload
+
+        for name in streams:
+            if name in pending:
+                yield name, 'timeout', None
+    finally:
+        # Also reached when the client disconnects and the generator is closed
+        stop.set()
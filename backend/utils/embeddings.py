@@ -1,8 +1,125 @@
-
 ### utils/embeddings.py
-from ollama import Embedding
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from database.connection import DB_PATH, query_all, transaction
+from utils.llm import ollama_client
+from utils.llm_scheduler import INTERACTIVE, llm_scheduler
+from utils.model_registry import model_registry
+
+# Texts sent to Ollama per embed request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "1") == "1"
+
+# SQLite caps bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings keyed by (content hash, model), stored as float32 blobs in
+    SQLite, so unchanged text is never embedded twice, even across restarts."""
+
+    def __init__(self, persist: bool = EMBEDDING_CACHE_PERSIST, db_path: str = DB_PATH):
+        self.persist = persist
+        self.db_path = db_path
+        self._ready = False
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _init_table(self) -> bool:
+        """Create the cache table on first use"""
+        with self._lock:
+            if self.persist and not self._ready:
+                try:
+                    with transaction(self.db_path) as conn:
+                        conn.execute("""
+                            CREATE TABLE IF NOT EXISTS embedding_cache (
+                                content_hash TEXT NOT NULL,
+                                model TEXT NOT NULL,
+                                vector BLOB NOT NULL,
+                                PRIMARY KEY (content_hash, model)
+                            ) WITHOUT ROWID
+                        """)
+                    self._ready = True
+                except sqlite3.Error as e:
+                    print(f"Embedding cache: persistence disabled ({e})")
+                    self.persist = False
+            return self.persist
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        if self._init_table():
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start:start + _LOOKUP_CHUNK]
+                rows = query_all(
+                    f"SELECT content_hash, vector FROM embedding_cache "
+                    f"WHERE model = ? AND content_hash IN ({', '.join('?' for _ in chunk)})",
+                    [model, *chunk],
+                    db_path=self.db_path
+                )
+                found.update({key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows})
+        with self._lock:
+            self.counters["hits"] += len(found)
+            self.counters["misses"] += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        if vectors and self._init_table():
+            with transaction(self.db_path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (content_hash, model, vector) VALUES (?, ?, ?)",
+                    [(key, model, vector.astype(np.float32).tobytes()) for key, vector in vectors.items()]
+                )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+embedding_cache = EmbeddingCache()
+
+
+def embed_texts(
+    texts: Sequence[str],
+    priority: int = INTERACTIVE,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    cache: Optional[EmbeddingCache] = None,
+    model: Optional[str] = None
+) -> np.ndarray:
+    """Embed many texts as a (len(texts), dim) float32 matrix.
+
+    Cached and duplicate texts are skipped; the rest go to Ollama batch_size
+    texts per request. The embedding model is resolved on first use unless
+    one is given.
+    """
+    cache = cache or embedding_cache
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    model = model or model_registry.resolve('embedding')
+    hashes = [content_hash(text) for text in texts]
+    vectors = cache.get_many(model, hashes)
+
+    pending = list({key: text for key, text in zip(hashes, texts) if key not in vectors}.items())
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        with llm_scheduler.slot(model, priority):
+            response = ollama_client.embed(
+                model=model, input=[text for _, text in batch], **model_registry.request_options('embedding')
+            )
+        new = {key: np.asarray(vector, dtype=np.float32) for (key, _), vector in zip(batch, response['embeddings'])}
+        cache.put_many(model, new)
+        vectors.update(new)
+
+    return np.stack([vectors[key] for key in hashes])
 
-embed_model = Embedding(model="distilbert")
 
-def generate_embedding(text):
-    return embed_model.embed(text)
\ No newline at end of file
+def generate_embedding(text: str, priority: int = INTERACTIVE, model: Optional[str] = None) -> List[float]:
+    return embed_texts([text], priority, model=model)[0].tolist()
@@ -0,0 +1,112 @@
+### utils/intent_classifier.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Labelled example queries the classifier is trained on at import time.
+# Add phrasings here when the fallback rate shows a gap.
+EXAMPLE_QUERIES = {
+    'farming': [
+        "how do I grow potatoes in loamy soil",
+        "what fertilizer should I use for wheat",
+        "my tomato leaves have yellow spots what pest is this",
+        "when should I sow rice this season",
+        "how much water does maize need",
+        "best crop rotation after sugarcane",
+        "how to control aphids on my cotton",
+        "what seeds are good for sandy soil",
+        "how do I improve my soil health",
+        "irrigation schedule for onion crop",
+        "which pesticide is safe for vegetables",
+        "my crop is wilting what should I do",
+        "how deep should I plant groundnut",
+        "advice for farming in clay soil with little rain",
+        "how to prepare my field before planting",
+        "my wheat has rust disease how do I treat it",
+        "fungus on my chilli plants",
+    ],
+    'market': [
+        "what is the price of wheat today",
+        "where can I sell my onions for the best rate",
+        "what is the mandi rate for tomato",
+        "will potato prices go up next month",
+        "market demand for rice this season",
+        "which crop sells for the most money",
+        "current market price of cotton per quintal",
+        "should I store my grain or sell now",
+        "how much will I get for my soybean harvest",
+        "price trend for chilli in the market",
+        "is there demand for organic vegetables",
+        "what are buyers paying for maize",
+        "compare prices in nearby markets",
+        "forecast for sugarcane prices",
+        "profit from selling mustard this year",
+    ],
+    'sustainability': [
+        "what is the carbon footprint of growing rice",
+        "how much water does my farm use compared to others",
+        "how sustainable is growing cotton in black soil",
+        "environmental impact of using chemical fertilizer",
+        "how can I reduce greenhouse gas emissions on my farm",
+        "is my farming practice eco friendly",
+        "sustainability score for wheat farming",
+        "how to lower water usage and conserve groundwater",
+        "what is the environmental cost of pesticides",
+        "how to make my farm more sustainable",
+        "soil carbon and climate impact of tillage",
+        "evaluate the sustainability of sugarcane",
+        "how does burning stubble affect the environment",
+        "biodiversity impact of monocropping",
+        "renewable energy for irrigation pumps",
+    ],
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """Multinomial Naive Bayes over word unigrams and bigrams.
+
+    Small enough to train at import and classify in microseconds, which is
+    all routing a query between a handful of agents needs.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]] = EXAMPLE_QUERIES, alpha: float = 1.0):
+        self.alpha = alpha
+        self.labels = list(examples)
+        total = sum(len(queries) for queries in examples.values())
+        self._log_prior = {label: math.log(len(examples[label]) / total) for label in self.labels}
+        counts = {label: Counter(f for query in examples[label] for f in _features(query)) for label in self.labels}
+        self._vocabulary = set().union(*counts.values())
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for label in self.labels:
+            denominator = sum(counts[label].values()) + alpha * len(self._vocabulary)
+            self._log_likelihood[label] = {
+                feature: math.log((count + alpha) / denominator)
+                for feature, count in counts[label].items()
+            }
+            self._log_unseen[label] = math.log(alpha / denominator)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return the most likely intent and its posterior probability"""
+        features = [f for f in _features(text) if f in self._vocabulary]
+        scores = {
+            label: self._log_prior[label] + sum(
+                self._log_likelihood[label].get(f, self._log_unseen[label]) for f in features
+            )
+            for label in self.labels
+        }
+        best = max(scores, key=scores.get)
+        # Softmax over the log scores, shifted for numerical stability
+        normaliser = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normaliser
+
+
+intent_classifier = IntentClassifier()
@@ -0,0 +1,105 @@
+### utils/llm.py
+import os
+import threading
+import ollama
+from typing import Any, Dict, Iterator, List
+from utils.llm_cache import LLMResponseCache, make_cache_key
+from utils.llm_scheduler import INTERACTIVE, llm_scheduler
+
+# Seconds an Ollama request may go without a response (or, streaming, without
+# a chunk) before it fails; an abandoned call then frees its thread and slot
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+
+# Shared by every agent so identical prompts are only generated once
+response_cache = LLMResponseCache()
+
+# Every generation and embedding goes through this client so it gets the timeout
+ollama_client = ollama.Client(timeout=LLM_CALL_TIMEOUT)
+
+
+class PrefillStats:
+    """Per-model totals of the timings Ollama reports with each generation.
+
+    prompt_eval_count only counts prompt tokens that were not already in the
+    model's KV cache, so a falling prompt_tokens_per_call means shared
+    prompt prefixes are being reused.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, float]] = {}
+
+    def record(self, model: str, response: Any):
+        """Add one finished generation (a response or the final stream chunk)"""
+        call = {
+            "prompt_tokens": response.get('prompt_eval_count') or 0,
+            "prompt_eval_seconds": (response.get('prompt_eval_duration') or 0) / 1e9,
+            "eval_tokens": response.get('eval_count') or 0,
+            "eval_seconds": (response.get('eval_duration') or 0) / 1e9,
+            "load_seconds": (response.get('load_duration') or 0) / 1e9,
+        }
+        with self._lock:
+            totals = self._models.setdefault(model, dict.fromkeys(["calls", *call], 0))
+            totals["calls"] += 1
+            for name, value in call.items():
+                totals[name] += value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            models = {model: dict(totals) for model, totals in self._models.items()}
+        for totals in models.values():
+            totals["prompt_tokens_per_call"] = totals["prompt_tokens"] / totals["calls"]
+            totals["prompt_eval_seconds_per_call"] = totals["prompt_eval_seconds"] / totals["calls"]
+        return models
+
+
+prefill_stats = PrefillStats()
+
+
+def _cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    # keep_alive only affects how long the model stays loaded, not its output
+    return make_cache_key(model, messages, **{k: v for k, v in params.items() if k != 'keep_alive'})
+
+
+def chat(model: str, messages: List[Dict[str, str]], priority: int = INTERACTIVE, **kwargs) -> Dict[str, Any]:
+    """Drop-in replacement for ollama.chat that serves repeated prompts from the cache.
+
+    Cache misses wait for a slot on the model (see utils.llm_scheduler) and
+    raise Overloaded if none frees up in time.
+    """
+    key = _cache_key(model, messages, kwargs)
+    content = response_cache.get(key)
+    if content is not None:
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": content},
+            "cached": True
+        }
+
+    with llm_scheduler.slot(model, priority):
+        response = ollama_client.chat(model=model, messages=messages, **kwargs)
+    prefill_stats.record(model, response)
+    response_cache.set(key, model, response['message']['content'])
+    return response
+
+
+def stream_chat(model: str, messages: List[Dict[str, str]], priority: int = INTERACTIVE, **kwargs) -> Iterator[str]:
+    """Yield response text as the model generates it; cached responses arrive as one chunk"""
+    key = _cache_key(model, messages, kwargs)
+    content = response_cache.get(key)
+    if content is not None:
+        yield content
+        return
+
+    parts = []
+    # The slot is held until the last token (or until the consumer goes away)
+    with llm_scheduler.slot(model, priority):
+        for chunk in ollama_client.chat(model=model, messages=messages, stream=True, **kwargs):
+            parts.append(chunk['message']['content'])
+            if chunk.get('done'):
+                # The final chunk carries the timings for the whole generation
+                prefill_stats.record(model, chunk)
+            yield parts[-1]
+
+    # Only complete generations are cached
+    response_cache.set(key, model, ''.join(parts))
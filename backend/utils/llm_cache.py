@@ -0,0 +1,186 @@
+### utils/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from database.connection import DB_PATH, query_one, transaction
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(6 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "1") == "1"
+# Rows kept in the SQLite tier; the oldest beyond this are swept
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "10000"))
+# Seconds between sweeps of expired and excess rows
+LLM_CACHE_SWEEP_INTERVAL = float(os.getenv("LLM_CACHE_SWEEP_INTERVAL", "300"))
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], **params) -> str:
+    """Hash the model, messages and any generation parameters into a stable key"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier cache for model responses: an in-memory LRU in front of an
+    optional SQLite table that survives restarts."""
+
+    def __init__(
+        self,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        persist: bool = LLM_CACHE_PERSIST,
+        db_path: str = DB_PATH,
+        max_rows: int = LLM_CACHE_MAX_ROWS,
+        sweep_interval: float = LLM_CACHE_SWEEP_INTERVAL
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._entries = OrderedDict()  # key -> (stored_at, content)
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "swept_rows": 0,
+        }
+        if self.persist:
+            self._init_table()
+
+    def _init_table(self):
+        """Create the persistent cache table if it does not exist"""
+        try:
+            with transaction(self.db_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        stored_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_stored_at ON llm_cache (stored_at)")
+        except sqlite3.Error as e:
+            print(f"LLM cache: persistent tier disabled ({e})")
+            self.persist = False
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached content for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        row = self._load(key) if self.persist else None
+        with self._lock:
+            if row and now - row[0] < self.ttl:
+                self._remember(key, row[0], row[1])
+                self.counters["disk_hits"] += 1
+                return row[1]
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, key: str, model: str, content: str):
+        """Store a response in both tiers"""
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, content)
+            self.counters["stores"] += 1
+        if self.persist:
+            self._save(key, model, content, stored_at)
+
+    def _remember(self, key: str, stored_at: float, content: str):
+        """Insert into the LRU tier, evicting the least recently used entries (lock held)"""
+        self._entries[key] = (stored_at, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _load(self, key: str):
+        try:
+            return query_one(
+                "SELECT stored_at, content FROM llm_cache WHERE cache_key = ?", (key,), db_path=self.db_path
+            )
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+
+    def _save(self, key: str, model: str, content: str, stored_at: float):
+        try:
+            with transaction(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (cache_key, model, content, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, model, content, stored_at)
+                )
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+            return
+        with self._lock:
+            due = stored_at - self._last_sweep >= self.sweep_interval
+            if due:
+                self._last_sweep = stored_at
+        if due:
+            self._sweep(stored_at)
+
+    def _sweep(self, now: float):
+        """Delete expired rows and the oldest rows beyond max_rows (both via the stored_at index).
+
+        Runs every sweep_interval seconds, so the table may briefly exceed
+        max_rows by the writes in between.
+        """
+        try:
+            with transaction(self.db_path) as conn:
+                # Expired rows are only ever misses
+                removed = conn.execute("DELETE FROM llm_cache WHERE stored_at < ?", (now - self.ttl,)).rowcount
+                removed += conn.execute(
+                    """DELETE FROM llm_cache WHERE stored_at < (
+                        SELECT stored_at FROM llm_cache ORDER BY stored_at DESC LIMIT 1 OFFSET ?
+                    )""",
+                    (self.max_rows - 1,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"LLM cache sweep failed: {e}")
+            return
+        with self._lock:
+            self.counters["swept_rows"] += removed
+
+    def clear(self):
+        """Drop every cached response from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self.persist:
+            try:
+                with transaction(self.db_path) as conn:
+                    conn.execute("DELETE FROM llm_cache")
+            except sqlite3.Error as e:
+                print(f"LLM cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the current size of the memory tier"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,160 @@
+### utils/llm_scheduler.py
+import heapq
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Generations allowed in flight per model; Ollama serialises beyond its own
+# OLLAMA_NUM_PARALLEL anyway, so extra concurrency only adds latency.
+# Override per model with LLM_MODEL_LIMITS='{"gemma": 1, "tinyllama": 4}'
+LLM_MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", "2"))
+# Calls allowed to wait for a slot across all models before new work is shed
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+# Seconds a call may wait for a slot before it is dropped
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE", "30"))
+
+# Lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Overloaded(RuntimeError):
+    """Raised when a model call is shed instead of queued; served as 503"""
+
+
+def _load_limits() -> Dict[str, int]:
+    override = os.getenv("LLM_MODEL_LIMITS")
+    if not override:
+        return {}
+    try:
+        return {model: int(limit) for model, limit in json.loads(override).items()}
+    except (ValueError, AttributeError) as e:
+        print(f"Ignoring invalid LLM_MODEL_LIMITS: {e}")
+        return {}
+
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _ModelState:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiters: List[tuple] = []  # heap of (priority, seq, _Waiter)
+
+
+class LLMScheduler:
+    """Admission control in front of Ollama.
+
+    Each model gets a fixed number of concurrent generations. Callers beyond
+    that wait in a bounded priority queue (interactive before background) and
+    give up after a deadline; when the queue is full new calls fail at once
+    with Overloaded, so a burst degrades into fast rejections instead of
+    every request timing out together.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = LLM_MODEL_CONCURRENCY,
+        max_queue: int = LLM_QUEUE_SIZE,
+        deadline: float = LLM_QUEUE_DEADLINE
+    ):
+        self.limits = _load_limits() if limits is None else limits
+        self.default_limit = default_limit
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._models: Dict[str, _ModelState] = {}
+        self._queued = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = 0
+        self.expired = 0
+
+    def _state(self, model: str) -> _ModelState:
+        if model not in self._models:
+            self._models[model] = _ModelState(self.limits.get(model, self.default_limit))
+        return self._models[model]
+
+    def admit(self):
+        """Fail fast, before any work is done, if the queue is already full"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"LLM queue full ({self._queued} waiting)")
+
+    def reject(self, reason: str) -> Overloaded:
+        """Count a call turned away before reaching the queue (e.g. no worker thread free)"""
+        with self._lock:
+            self.shed += 1
+        return Overloaded(reason)
+
+    def _acquire(self, model: str, priority: int, deadline: float):
+        with self._lock:
+            state = self._state(model)
+            if state.active < state.limit and not state.waiters:
+                state.active += 1
+                self.admitted += 1
+                return
+            if self._queued >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"LLM queue full ({self._queued} waiting)")
+            waiter = _Waiter()
+            heapq.heappush(state.waiters, (priority, next(self._seq), waiter))
+            self._queued += 1
+
+        waiter.event.wait(deadline)
+        with self._lock:
+            if waiter.granted:
+                self.admitted += 1
+                return
+            # Left in the heap and skipped when popped
+            waiter.cancelled = True
+            self._queued -= 1
+            self.expired += 1
+        raise Overloaded(f"Waited more than {deadline:g}s for {model}")
+
+    def _release(self, model: str):
+        with self._lock:
+            state = self._models[model]
+            state.active -= 1
+            while state.waiters:
+                _, _, waiter = heapq.heappop(state.waiters)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                state.active += 1
+                self._queued -= 1
+                waiter.event.set()
+                break
+
+    @contextmanager
+    def slot(self, model: str, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold one of the model's generation slots for the duration of the block"""
+        self._acquire(model, priority, self.deadline if deadline is None else deadline)
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "active": {model: state.active for model, state in self._models.items()},
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "expired": self.expired,
+            }
+
+
+# Shared by every model call in the process
+llm_scheduler = LLMScheduler()
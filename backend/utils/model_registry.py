@@ -0,0 +1,171 @@
+### utils/model_registry.py
+import json
+import os
+import threading
+import time
+import ollama
+from typing import Any, Dict, Iterable, List, Optional, Set
+from utils.llm_scheduler import BACKGROUND, llm_scheduler
+
+MODEL_REGISTRY_TTL = float(os.getenv("MODEL_REGISTRY_TTL", "300"))
+MODEL_KEEP_ALIVE = os.getenv("MODEL_KEEP_ALIVE", "30m")
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"
+# Context window (tokens) for roles that do not set their own
+MODEL_NUM_CTX = int(os.getenv("MODEL_NUM_CTX", "2048"))
+
+# Preferred models per role, best first. Override any role with
+# MODEL_FALLBACKS='{"pest_management": ["llama3.2", "tinyllama"]}'
+DEFAULT_FALLBACKS = {
+    'sustainability': ['phi', 'gemma', 'tinyllama'],
+    'pest_management': ['tinyllama', 'phi', 'gemma'],
+    'resource_optimization': ['gemma', 'phi', 'tinyllama'],
+    'trend_analysis': ['phi', 'gemma', 'tinyllama'],
+    'demand_forecast': ['tinyllama', 'phi', 'gemma'],
+    'price_prediction': ['gemma', 'phi', 'tinyllama'],
+    'sustainability_evaluation': ['gemma', 'phi', 'tinyllama'],
+    'intent_classification': ['tinyllama', 'phi', 'gemma'],
+    # Single-pass advice: all three sections as one JSON object
+    'structured_advice': ['gemma', 'phi', 'tinyllama'],
+    # Embedding models are never preloaded: they cannot serve generate()
+    'embedding': ['nomic-embed-text', 'mxbai-embed-large', 'all-minilm'],
+}
+
+
+# Per-role request settings, merged over keep_alive=MODEL_KEEP_ALIVE and
+# num_ctx=MODEL_NUM_CTX. Roles that resolve to the same model should agree:
+# Ollama reloads a model when num_ctx changes, and the latest keep_alive wins.
+# Set with MODEL_ROLE_OPTIONS='{"structured_advice": {"num_ctx": 4096, "keep_alive": "1h"}}'
+DEFAULT_ROLE_OPTIONS: Dict[str, Dict[str, Any]] = {}
+
+
+def _load_fallbacks() -> Dict[str, List[str]]:
+    fallbacks = dict(DEFAULT_FALLBACKS)
+    override = os.getenv("MODEL_FALLBACKS")
+    if override:
+        try:
+            fallbacks.update(json.loads(override))
+        except ValueError as e:
+            print(f"Ignoring invalid MODEL_FALLBACKS: {e}")
+    return fallbacks
+
+
+def _load_role_options() -> Dict[str, Dict[str, Any]]:
+    options = {role: dict(values) for role, values in DEFAULT_ROLE_OPTIONS.items()}
+    override = os.getenv("MODEL_ROLE_OPTIONS")
+    if override:
+        try:
+            for role, values in json.loads(override).items():
+                options.setdefault(role, {}).update(values)
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring invalid MODEL_ROLE_OPTIONS: {e}")
+    return options
+
+
+class ModelRegistry:
+    """Process-wide view of which Ollama models are installed and which one
+    each agent role should use."""
+
+    def __init__(
+        self,
+        fallbacks: Optional[Dict[str, List[str]]] = None,
+        ttl: float = MODEL_REGISTRY_TTL,
+        keep_alive: str = MODEL_KEEP_ALIVE,
+        preload: bool = MODEL_PRELOAD,
+        num_ctx: int = MODEL_NUM_CTX,
+        role_options: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.fallbacks = fallbacks or _load_fallbacks()
+        self.ttl = ttl
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.role_options = role_options if role_options is not None else _load_role_options()
+        self.preload = preload
+        self._available: Optional[Set[str]] = None
+        self._checked_at = 0.0
+        self._resolved: Dict[str, str] = {}
+        self._warmed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Re-read the installed models from Ollama and forget earlier resolutions"""
+        try:
+            available = set()
+            for entry in ollama.list()['models']:
+                name = entry.get('model') or entry.get('name')
+                # "phi:latest" should satisfy a request for "phi"
+                available.update({name, name.split(':')[0]})
+            print(f"Available models: {sorted(available)}")
+        except Exception as e:
+            print(f"Error checking models: {e}")
+            available = set()
+
+        with self._lock:
+            self._available = available
+            self._checked_at = time.monotonic()
+            self._resolved = {}
+
+    def _ensure_fresh(self):
+        if self._available is None or time.monotonic() - self._checked_at > self.ttl:
+            self.refresh()
+
+    def resolve(self, role: str) -> str:
+        """Return the first installed model in the role's fallback chain"""
+        self._ensure_fresh()
+        with self._lock:
+            if role in self._resolved:
+                return self._resolved[role]
+
+            chain = self.fallbacks[role]
+            model = next((m for m in chain if m in self._available), None)
+            if model is None:
+                # Nothing installed (or Ollama unreachable): use the last resort
+                model = chain[-1]
+                print(f"No model for {role} found in {chain}, using {model}")
+            elif model != chain[0]:
+                print(f"Model {chain[0]} not found, using {model} for {role}")
+            self._resolved[role] = model
+            return model
+
+    def resolve_all(self, roles: Iterable[str]) -> Dict[str, str]:
+        return {role: self.resolve(role) for role in roles}
+
+    def request_options(self, role: str) -> Dict[str, Any]:
+        """keep_alive and options to send with every call made for this role.
+
+        Sending keep_alive on each call stops Ollama from falling back to its
+        own 5 minute default and unloading the model (and its KV cache).
+        """
+        settings = {'keep_alive': self.keep_alive, 'num_ctx': self.num_ctx, **self.role_options.get(role, {})}
+        keep_alive = settings.pop('keep_alive')
+        return {'keep_alive': keep_alive, 'options': settings}
+
+    def warm(self, roles: Iterable[str]):
+        """Load the models for these roles in the background and keep them resident"""
+        if not self.preload:
+            return
+        # One preload per model, with the first of its roles' options
+        models = {}
+        for role, model in self.resolve_all(roles).items():
+            models.setdefault(model, role)
+        with self._lock:
+            models = {model: role for model, role in models.items() if model not in self._warmed}
+            self._warmed |= set(models)
+        for model, role in models.items():
+            threading.Thread(target=self._preload, args=(model, role), daemon=True).start()
+
+    def _preload(self, model: str, role: str):
+        try:
+            # An empty prompt loads the model without generating anything.
+            # It is loaded with the role's num_ctx, or the first call reloads it.
+            # Loading competes with generations, so it queues behind them
+            params = self.request_options(role)
+            with llm_scheduler.slot(model, BACKGROUND):
+                ollama.generate(model=model, prompt='', **params)
+            print(f"Preloaded model {model} (keep_alive={params['keep_alive']})")
+        except Exception as e:
+            print(f"Error preloading {model}: {e}")
+            with self._lock:
+                self._warmed.discard(model)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,133 @@
+### utils/query_parsing.py
+import re
+from dataclasses import astuple, dataclass, fields
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+REQUIRED_FIELDS = ('location', 'crop', 'soil_type')
+
+# Alternative names -> canonical id. Ids are lower-case; the title-cased id is
+# the label stored in the database ("new york" -> "New York").
+CROP_ALIASES = {
+    'maize': 'corn',
+    'paddy': 'rice',
+    'soy': 'soybean',
+    'soya': 'soybean',
+    'soyabean': 'soybean',
+    'soybeans': 'soybean',
+}
+SOIL_ALIASES = {
+    'loam': 'loamy',
+    'sand': 'sandy',
+    'silt': 'silty',
+    'clayey': 'clay',
+}
+LOCATION_ALIASES = {
+    'ca': 'california',
+    'fl': 'florida',
+    'ny': 'new york',
+    'tx': 'texas',
+    'wa': 'washington',
+}
+
+# "key:" at the start of the string or after a comma. Values run up to the next
+# key, so they may themselves contain commas ("pest issues: aphids, thrips").
+_KEY = re.compile(r'(?:^|,)\s*([A-Za-z][A-Za-z _]*?)\s*:')
+
+
+class QueryError(ValueError):
+    """The request does not describe a complete advice query"""
+
+
+def canonical_id(value: Any, aliases: Optional[Dict[str, str]] = None) -> str:
+    text = ' '.join(str(value or '').replace('_', ' ').casefold().split())
+    return (aliases or {}).get(text, text)
+
+
+def tokenize(text: str) -> Dict[str, str]:
+    """Split a "key: value, key: value" string in one pass; keys come back snake_cased"""
+    matches = list(_KEY.finditer(text))
+    values = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        values['_'.join(match.group(1).lower().split())] = text[match.end():end].strip()
+    return values
+
+
+@dataclass(frozen=True)
+class AdviceQuery:
+    """A farm advice request in canonical form.
+
+    Built from JSON fields or the legacy "key: value" string; equivalent
+    requests ("Wheat", " wheat ") compare, hash and key caches identically.
+    """
+
+    location: str
+    crop: str
+    soil_type: str
+    season: str = ''
+    water_availability: str = ''
+    previous_crop: str = ''
+    pest_issues: str = ''
+
+    @classmethod
+    def create(cls, **values: Any) -> 'AdviceQuery':
+        """Canonicalize raw field values; unknown fields are ignored"""
+        return cls(
+            location=canonical_id(values.get('location'), LOCATION_ALIASES),
+            crop=canonical_id(values.get('crop'), CROP_ALIASES),
+            soil_type=canonical_id(values.get('soil_type'), SOIL_ALIASES),
+            season=canonical_id(values.get('season')),
+            water_availability=canonical_id(values.get('water_availability')),
+            previous_crop=canonical_id(values.get('previous_crop'), CROP_ALIASES),
+            pest_issues=canonical_id(values.get('pest_issues')),
+        )
+
+    @classmethod
+    def parse(cls, text: str) -> 'AdviceQuery':
+        """Parse the legacy string format; repeated strings are parsed once"""
+        return _parse_cached(text)
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]]) -> 'AdviceQuery':
+        """Build a validated query from a request body: JSON fields or {"input": "key: value, ..."}"""
+        payload = payload or {}
+        if not isinstance(payload, dict):
+            raise QueryError("Request body must be a JSON object")
+        if isinstance(payload.get('input'), str) and payload['input'].strip():
+            query = cls.parse(payload['input'])
+        elif any(payload.get(name) for name in REQUIRED_FIELDS):
+            query = cls.create(**payload)
+        else:
+            raise QueryError("Missing input parameter")
+        query.validate()
+        return query
+
+    def validate(self):
+        if not all(getattr(self, name) for name in REQUIRED_FIELDS):
+            raise QueryError("Missing required parameters: location, crop, and soil_type")
+
+    @property
+    def key(self) -> Tuple[str, ...]:
+        """Shared cache key for this query"""
+        return astuple(self)
+
+    def describe(self, names: Optional[Sequence[str]] = None) -> str:
+        """Normalized one-line description of the given (default: all) fields, e.g. for embedding the request"""
+        names = names or [field.name for field in fields(self)]
+        return '; '.join(
+            f"{name.replace('_', ' ')}: {getattr(self, name)}"
+            for name in names if getattr(self, name)
+        )
+
+    def as_kwargs(self) -> Dict[str, str]:
+        """get_farm_advice keyword arguments, with ids mapped to their database labels"""
+        kwargs = {field.name: getattr(self, field.name) for field in fields(self)}
+        for name in ('location', 'crop', 'soil_type', 'previous_crop'):
+            kwargs[name] = kwargs[name].title()
+        return kwargs
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(text: str) -> AdviceQuery:
+    return AdviceQuery.create(**tokenize(text))
@@ -0,0 +1,76 @@
+### utils/semantic_cache.py
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Cosine similarity a stored request needs to count as the same question
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(6 * 60 * 60)))
+SEMANTIC_CACHE_MAX_PER_KEY = int(os.getenv("SEMANTIC_CACHE_MAX_PER_KEY", "128"))
+
+
+class SemanticCache:
+    """Reuse answers to requests that are worded differently but mean the same.
+
+    Entries are grouped by an exact partition key (e.g. a tuple of field ids) so that
+    only requests which already agree on it are compared; within a partition
+    the most similar stored request at or above the threshold is a hit.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_per_key: int = SEMANTIC_CACHE_MAX_PER_KEY
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_key = max_per_key
+        self._partitions: Dict[Hashable, List[Tuple[float, np.ndarray, Any]]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "hits": 0, "stores": 0}
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def lookup(self, partition: Hashable, vector: Sequence[float]) -> Tuple[Optional[Any], Optional[float]]:
+        """Return (value, similarity) of the nearest live entry.
+
+        value is None below the threshold; similarity is None if there was nothing to compare.
+        """
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            self.counters["lookups"] += 1
+            entries = [e for e in self._partitions.get(partition, []) if now - e[0] < self.ttl]
+            self._partitions[partition] = entries
+            if not entries or entries[0][1].shape != query.shape:
+                return None, None
+            similarities = np.stack([e[1] for e in entries]) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None, similarity
+            self.counters["hits"] += 1
+            return entries[best][2], similarity
+
+    def store(self, partition: Hashable, vector: Sequence[float], value: Any):
+        with self._lock:
+            entries = self._partitions.setdefault(partition, [])
+            entries.append((time.time(), self._unit(vector), value))
+            del entries[:-self.max_per_key]
+            self.counters["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["lookups"]
+            return {
+                **self.counters,
+                "entries": sum(len(entries) for entries in self._partitions.values()),
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,138 @@
+### utils/vector_index.py
+import json
+import os
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class VectorIndex:
+    """Append-only float32 vector store with brute-force cosine search.
+
+    Vectors live in "<path>.f32" as one row-major float32 matrix, their row
+    ids in "<path>.ids" as int64, and the embedding model, dimension and
+    whether the initial build finished in "<path>.json". Reads memory-map
+    the files, so opening the index costs nothing and searching is one
+    matrix-vector product. New rows are appended without a rebuild.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.model: Optional[str] = None
+        self.dim: Optional[int] = None
+        self.complete = False
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._id_set = set()
+        self._lock = threading.Lock()
+        # Held by whoever is embedding rows into the index, so agents sharing it take turns
+        self.update_lock = threading.Lock()
+        self._load()
+
+    def _file(self, suffix: str) -> str:
+        return f"{self.path}.{suffix}"
+
+    def _load(self):
+        try:
+            with open(self._file('json')) as f:
+                meta = json.load(f)
+            self.model, self.dim, self.complete = meta['model'], meta['dim'], meta['complete']
+        except (OSError, ValueError, KeyError):
+            # Missing, or written before the model was recorded: rebuild
+            return
+        if self.dim is None:
+            return
+        count = min(
+            os.path.getsize(self._file('f32')) // (4 * self.dim),
+            os.path.getsize(self._file('ids')) // 8
+        )
+        if count:
+            # A torn append (crash between the two files) is ignored
+            self._vectors = np.memmap(self._file('f32'), dtype=np.float32, mode='r', shape=(count, self.dim))
+            self._ids = np.memmap(self._file('ids'), dtype=np.int64, mode='r', shape=(count,))
+            self._id_set = set(self._ids.tolist())
+
+    def __len__(self) -> int:
+        return 0 if self._ids is None else len(self._ids)
+
+    def __contains__(self, row_id: int) -> bool:
+        return row_id in self._id_set
+
+    def max_id(self) -> int:
+        """Highest indexed row id, or 0 when empty"""
+        return 0 if not len(self) else int(self._ids.max())
+
+    def ready(self, model: str) -> bool:
+        """Whether every row was embedded with this model, so search results are complete"""
+        return self.complete and self.model == model
+
+    def _write_meta(self):
+        with open(self._file('json'), 'w') as f:
+            json.dump({'model': self.model, 'dim': self.dim, 'complete': self.complete}, f)
+
+    def reset(self, model: str):
+        """Drop every vector and start over for another embedding model.
+
+        Vectors from different models are not comparable (even at the same
+        dimension), so the index is not ready until it is rebuilt.
+        """
+        with self._lock:
+            self._vectors = self._ids = None
+            self._id_set = set()
+            self.model, self.dim, self.complete = model, None, False
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            for suffix in ('f32', 'ids'):
+                open(self._file(suffix), 'wb').close()
+            self._write_meta()
+
+    def mark_complete(self):
+        """Record that every stored row has been indexed with the current model"""
+        with self._lock:
+            if not self.complete:
+                self.complete = True
+                self._write_meta()
+
+    def add(self, ids: Sequence[int], vectors: Iterable[Sequence[float]]) -> int:
+        """Append vectors for rows not indexed yet; returns how many were added"""
+        matrix = np.asarray(list(vectors), dtype=np.float32)
+        if not len(ids):
+            return 0
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._write_meta()
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors from {self.model}, got {matrix.shape[1]}")
+            keep = [i for i, row_id in enumerate(ids) if row_id not in self._id_set]
+            if not keep:
+                return 0
+            matrix = matrix[keep]
+            # Store unit vectors so a dot product is the cosine similarity
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+            new_ids = np.asarray([ids[i] for i in keep], dtype=np.int64)
+            with open(self._file('f32'), 'ab') as f:
+                f.write(matrix.tobytes())
+            with open(self._file('ids'), 'ab') as f:
+                f.write(new_ids.tobytes())
+            self._id_set.update(new_ids.tolist())
+        self._load()
+        return len(keep)
+
+    def search(self, vector: Sequence[float], k: int = 5) -> List[Tuple[int, float]]:
+        """The k most similar rows as (id, cosine similarity), best first"""
+        vectors, ids = self._vectors, self._ids
+        if vectors is None or not len(vectors):
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            return []
+        query = query / (np.linalg.norm(query) or 1)
+        scores = vectors @ query
+        k = min(k, len(scores))
+        # Partial sort: only the top k are ordered
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]